@@ -0,0 +1,184 @@
+import itertools
+import cv2
+import numpy
+
+
+def assignDetections(cost, max_cost):
+    """Matches tracks to detections at the lowest total cost (the Hungarian method).
+    Args:
+        cost: A (tracks, detections) numpy.ndarray of matching costs.
+        max_cost: Pairs that cost more than this are never matched.
+    Returns:
+        A list of (track, detection) index pairs.
+    """
+    rows, columns = cost.shape
+    if rows == 0 or columns == 0:
+        return []
+    # pad to a square matrix where the padding, and gated pairs, cost more than any real match
+    size = max(rows, columns)
+    gated = max_cost * (size + 1) + 1
+    padded = numpy.full((size, size), gated, dtype=numpy.float64)
+    padded[:rows,:columns] = numpy.where(cost > max_cost, gated, cost)
+
+    # shortest augmenting path form of the Hungarian method, O(n^3); row/column 0 are sentinels
+    u = numpy.zeros(size + 1)
+    v = numpy.zeros(size + 1)
+    match = numpy.zeros(size + 1, dtype=numpy.intp) # column -> row
+    way = numpy.zeros(size + 1, dtype=numpy.intp)
+    for row in range(1, size + 1):
+        match[0] = row
+        column = 0
+        slack = numpy.full(size + 1, numpy.inf)
+        used = numpy.zeros(size + 1, dtype=bool)
+        while match[column] != 0:
+            used[column] = True
+            current = match[column]
+            reduced = padded[current - 1] - u[current] - v[1:]
+            free = ~used[1:]
+            better = free & (reduced < slack[1:])
+            slack[1:][better] = reduced[better]
+            way[1:][better] = column
+            candidates = numpy.flatnonzero(free)
+            next_column = candidates[numpy.argmin(slack[1:][candidates])] + 1
+            delta = slack[next_column]
+            u[match[used]] += delta
+            v[used] -= delta
+            slack[1:][free] -= delta
+            column = next_column
+        while column != 0:
+            previous = way[column]
+            match[column] = match[previous]
+            column = previous
+
+    pairs = []
+    for column in range(1, size + 1):
+        row = match[column] - 1
+        if row < rows and column - 1 < columns and cost[row, column - 1] <= max_cost:
+            pairs.append((row, column - 1))
+    return sorted(pairs)
+
+
+class Track:
+    """One ball followed across frames by a constant velocity Kalman filter.
+
+    The state is the centre and distance (x, y, d) and their rates of change.
+    """
+
+    def __init__(self, track_id, x, y, distance, timestamp, process_noise, measurement_noise):
+        self.id = track_id
+        self.hits = 1
+        self.misses = 0
+        self.timestamp = timestamp
+        self.kalman = cv2.KalmanFilter(6, 3)
+        self.kalman.measurementMatrix = numpy.eye(3, 6, dtype=numpy.float32)
+        self.kalman.processNoiseCov = numpy.eye(6, dtype=numpy.float32) * process_noise
+        self.kalman.measurementNoiseCov = numpy.eye(3, dtype=numpy.float32) * measurement_noise
+        self.kalman.errorCovPost = numpy.diag([measurement_noise] * 3 + [1000.0] * 3).astype(numpy.float32)
+        self.kalman.statePost = numpy.array([[x], [y], [distance], [0], [0], [0]], dtype=numpy.float32)
+
+    def __transition(self, dt):
+        transition = numpy.eye(6, dtype=numpy.float32)
+        transition[0, 3] = transition[1, 4] = transition[2, 5] = dt
+        return transition
+
+    def predict(self, timestamp):
+        """Advances the filter to timestamp and returns the predicted (x, y, distance)."""
+        self.kalman.transitionMatrix = self.__transition(max(timestamp - self.timestamp, 0.0))
+        self.timestamp = timestamp
+        return self.kalman.predict()[:3,0]
+
+    def correct(self, x, y, distance):
+        self.kalman.correct(numpy.array([[x], [y], [distance]], dtype=numpy.float32))
+        self.hits += 1
+        self.misses = 0
+
+    def position(self, lead=0.0):
+        """The filtered (x, y, distance), extrapolated lead seconds ahead."""
+        state = self.kalman.statePost[:,0]
+        return state[:3] + state[3:] * lead
+
+
+class BallTracker:
+    """Follows every candidate ball across frames and keeps a stable target.
+
+    Detections are matched to the tracks' predicted centres by assignDetections.
+    Unmatched detections start new tracks, and tracks unmatched for more than
+    max_misses frames are dropped. A track is confirmed after min_hits
+    matches. The target is the nearest confirmed track, and it is kept until
+    that track is dropped or another one is switch_margin inches closer.
+    """
+
+    def __init__(self, max_cost=40.0, max_misses=5, min_hits=3, switch_margin=6.0,
+                 process_noise=10.0, measurement_noise=4.0):
+        """
+        Args:
+            max_cost: The furthest, in pixels, a detection can be from a track's prediction.
+            max_misses: Frames a track survives without a detection.
+            min_hits: Detections before a track can become the target.
+            switch_margin: How much closer, in inches, another ball must be to take over.
+            process_noise: Kalman process noise, larger follows sudden moves more closely.
+            measurement_noise: Kalman measurement noise, larger smooths more.
+        """
+        self.max_cost = max_cost
+        self.max_misses = max_misses
+        self.min_hits = min_hits
+        self.switch_margin = switch_margin
+        self.process_noise = process_noise
+        self.measurement_noise = measurement_noise
+        self.tracks = []
+        self.target = None
+        self.timestamp = None
+        self.__ids = itertools.count(1)
+
+    def reset(self):
+        self.tracks = []
+        self.target = None
+        self.timestamp = None
+
+    def update(self, x_center, y_center, distance, timestamp):
+        """Matches one frame of detections to the tracks.
+        Args:
+            x_center: The detections' x centres as a numpy.ndarray, in pixels.
+            y_center: The detections' y centres.
+            distance: The detections' distances.
+            timestamp: The capture time of the frame, in seconds. A frame
+                that is not newer than the last one is ignored.
+        Returns:
+            The target Track, or None.
+        """
+        if self.timestamp is not None and timestamp <= self.timestamp:
+            return self.target
+        self.timestamp = timestamp
+
+        predicted = numpy.array([track.predict(timestamp) for track in self.tracks]).reshape(-1, 3)
+        cost = numpy.hypot(predicted[:,0,None] - x_center[None,:], predicted[:,1,None] - y_center[None,:])
+
+        pairs = assignDetections(cost, self.max_cost)
+        for track, detection in pairs:
+            self.tracks[track].correct(x_center[detection], y_center[detection], distance[detection])
+        matched_tracks = {track for track, _ in pairs}
+        matched = {detection for _, detection in pairs}
+        for index, track in enumerate(self.tracks):
+            if index not in matched_tracks:
+                track.misses += 1
+        self.tracks = [track for track in self.tracks if track.misses <= self.max_misses]
+
+        for detection in range(len(x_center)):
+            if detection not in matched:
+                self.tracks.append(Track(next(self.__ids), x_center[detection], y_center[detection],
+                                         distance[detection], timestamp,
+                                         self.process_noise, self.measurement_noise))
+
+        self.__chooseTarget()
+        return self.target
+
+    def __chooseTarget(self):
+        confirmed = [track for track in self.tracks if track.hits >= self.min_hits and track.misses == 0]
+        if self.target not in self.tracks:
+            self.target = None
+        if not confirmed:
+            return
+        nearest = min(confirmed, key=lambda track: track.position()[2])
+        if self.target is None or \
+                nearest.position()[2] < self.target.position()[2] - self.switch_margin:
+            self.target = nearest
@@ -1,185 +1,24 @@
-import cv2
-import numpy
-import math
-from enum import Enum
+from grip_pipeline import GripPipeline
 
-class BlueBallGripPipeline:
-    """
-    An OpenCV pipeline generated by GRIP.
-    """
-    
-    def __init__(self):
-        """initializes all values to presets or None if need to be set
-        """
-
-        self.__hsv_threshold_hue = [69.49152542372882, 149.68085106382978]
-        self.__hsv_threshold_saturation = [160.28677482209332, 255.0]
-        self.__hsv_threshold_value = [46.9915696299563, 255.0]
-
-        self.hsv_threshold_output = None
-
-        self.__cv_erode_src = self.hsv_threshold_output
-        self.__cv_erode_kernel = None
-        self.__cv_erode_anchor = (-1, -1)
-        self.__cv_erode_iterations = 0.0
-        self.__cv_erode_bordertype = cv2.BORDER_CONSTANT
-        self.__cv_erode_bordervalue = (-1)
-
-        self.cv_erode_output = None
-
-
-        self.__mask_mask = self.cv_erode_output
-
-        self.mask_output = None
-
-        self.__find_contours_input = self.cv_erode_output
-        self.__find_contours_external_only = False
-
-        self.find_contours_output = None
-
-        self.__filter_contours_contours = self.find_contours_output
-        self.__filter_contours_min_area = 207.0
-        self.__filter_contours_min_perimeter = 0.0
-        self.__filter_contours_min_width = 0.0
-        self.__filter_contours_max_width = 1000.0
-        self.__filter_contours_min_height = 0.0
-        self.__filter_contours_max_height = 1000.0
-        self.__filter_contours_solidity = [0, 100]
-        self.__filter_contours_max_vertices = 1000000.0
-        self.__filter_contours_min_vertices = 0.0
-        self.__filter_contours_min_ratio = 0.0
-        self.__filter_contours_max_ratio = 1000.0
-
-        self.filter_contours_output = None
 
-
-    def process(self, source0):
-        """
-        Runs the pipeline and sets all outputs to new values.
-        """
-        # Step HSV_Threshold0:
-        self.__hsv_threshold_input = source0
-        (self.hsv_threshold_output) = self.__hsv_threshold(self.__hsv_threshold_input, self.__hsv_threshold_hue, self.__hsv_threshold_saturation, self.__hsv_threshold_value)
-
-        # Step CV_erode0:
-        self.__cv_erode_src = self.hsv_threshold_output
-        (self.cv_erode_output) = self.__cv_erode(self.__cv_erode_src, self.__cv_erode_kernel, self.__cv_erode_anchor, self.__cv_erode_iterations, self.__cv_erode_bordertype, self.__cv_erode_bordervalue)
-
-        # Step Mask0:
-        self.__mask_input = source0
-        self.__mask_mask = self.cv_erode_output
-        (self.mask_output) = self.__mask(self.__mask_input, self.__mask_mask)
-
-        # Step Find_Contours0:
-        self.__find_contours_input = self.cv_erode_output
-        (self.find_contours_output) = self.__find_contours(self.__find_contours_input, self.__find_contours_external_only)
-
-        # Step Filter_Contours0:
-        self.__filter_contours_contours = self.find_contours_output
-        (self.filter_contours_output) = self.__filter_contours(self.__filter_contours_contours, self.__filter_contours_min_area, self.__filter_contours_min_perimeter, self.__filter_contours_min_width, self.__filter_contours_max_width, self.__filter_contours_min_height, self.__filter_contours_max_height, self.__filter_contours_solidity, self.__filter_contours_max_vertices, self.__filter_contours_min_vertices, self.__filter_contours_min_ratio, self.__filter_contours_max_ratio)
-
-
-    @staticmethod
-    def __hsv_threshold(input, hue, sat, val):
-        """Segment an image based on hue, saturation, and value ranges.
-        Args:
-            input: A BGR numpy.ndarray.
-            hue: A list of two numbers the are the min and max hue.
-            sat: A list of two numbers the are the min and max saturation.
-            lum: A list of two numbers the are the min and max value.
-        Returns:
-            A black and white numpy.ndarray.
-        """
-        out = cv2.cvtColor(input, cv2.COLOR_BGR2HSV)
-        return cv2.inRange(out, (hue[0], sat[0], val[0]),  (hue[1], sat[1], val[1]))
-
-    @staticmethod
-    def __cv_erode(src, kernel, anchor, iterations, border_type, border_value):
-        """Expands area of lower value in an image.
-        Args:
-           src: A numpy.ndarray.
-           kernel: The kernel for erosion. A numpy.ndarray.
-           iterations: the number of times to erode.
-           border_type: Opencv enum that represents a border type.
-           border_value: value to be used for a constant border.
-        Returns:
-            A numpy.ndarray after erosion.
-        """
-        return cv2.erode(src, kernel, anchor, iterations = (int) (iterations +0.5),
-                            borderType = border_type, borderValue = border_value)
-
-    @staticmethod
-    def __mask(input, mask):
-        """Filter out an area of an image using a binary mask.
-        Args:
-            input: A three channel numpy.ndarray.
-            mask: A black and white numpy.ndarray.
-        Returns:
-            A three channel numpy.ndarray.
-        """
-        return cv2.bitwise_and(input, input, mask=mask)
-
-    @staticmethod
-    def __find_contours(input, external_only):
-        """Sets the values of pixels in a binary image to their distance to the nearest black pixel.
-        Args:
-            input: A numpy.ndarray.
-            external_only: A boolean. If true only external contours are found.
-        Return:
-            A list of numpy.ndarray where each one represents a contour.
-        """
-        if(external_only):
-            mode = cv2.RETR_EXTERNAL
-        else:
-            mode = cv2.RETR_LIST
-        method = cv2.CHAIN_APPROX_SIMPLE
-        contours, hierarchy =cv2.findContours(input, mode=mode, method=method)
-        return contours
-
-    @staticmethod
-    def __filter_contours(input_contours, min_area, min_perimeter, min_width, max_width,
-                        min_height, max_height, solidity, max_vertex_count, min_vertex_count,
-                        min_ratio, max_ratio):
-        """Filters out contours that do not meet certain criteria.
-        Args:
-            input_contours: Contours as a list of numpy.ndarray.
-            min_area: The minimum area of a contour that will be kept.
-            min_perimeter: The minimum perimeter of a contour that will be kept.
-            min_width: Minimum width of a contour.
-            max_width: MaxWidth maximum width.
-            min_height: Minimum height.
-            max_height: Maximimum height.
-            solidity: The minimum and maximum solidity of a contour.
-            min_vertex_count: Minimum vertex Count of the contours.
-            max_vertex_count: Maximum vertex Count.
-            min_ratio: Minimum ratio of width to height.
-            max_ratio: Maximum ratio of width to height.
-        Returns:
-            Contours as a list of numpy.ndarray.
-        """
-        output = []
-        for contour in input_contours:
-            x,y,w,h = cv2.boundingRect(contour)
-            if (w < min_width or w > max_width):
-                continue
-            if (h < min_height or h > max_height):
-                continue
-            area = cv2.contourArea(contour)
-            if (area < min_area):
-                continue
-            if (cv2.arcLength(contour, True) < min_perimeter):
-                continue
-            hull = cv2.convexHull(contour)
-            solid = 100 * area / cv2.contourArea(hull)
-            if (solid < solidity[0] or solid > solidity[1]):
-                continue
-            if (len(contour) < min_vertex_count or len(contour) > max_vertex_count):
-                continue
-            ratio = (float)(w) / h
-            if (ratio < min_ratio or ratio > max_ratio):
-                continue
-            output.append(contour)
-        return output
+BLUE_BALL_PARAMS = {
+    "hsv_threshold": {
+        "hue": [69.49152542372882, 149.68085106382978],
+        "saturation": [160.28677482209332, 255.0],
+        "value": [46.9915696299563, 255.0],
+    },
+    "morphology": [("erode", 0.0)],
+    "mask": True,
+    "find_contours": {"external_only": True},
+    "filter_contours": {"min_area": 207.0},
+}
 
 
+class BlueBallGripPipeline(GripPipeline):
+    """
+    Finds blue cargo. The parameters match BlueBall.grip, except that
+    only outer contours are kept, so holes never reach the filter.
+    """
 
+    def __init__(self):
+        GripPipeline.__init__(self, BLUE_BALL_PARAMS)
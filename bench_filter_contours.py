@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+
+# Times GRIP's per-contour filterContours against ContourFilter on noisy
+# masks with hundreds of small contours, and checks they keep the same ones.
+# Then compares find + filter with every contour against outer contours only
+# on blobs riddled with holes, like a textured background.
+
+import time
+import cv2
+import numpy
+from grip_pipeline import ContourFilter, FILTER_CONTOURS_DEFAULTS, filterContours, findContours
+from rb_grip_contours import RED_BALL_PARAMS
+from bb_grip_contours import BLUE_BALL_PARAMS
+from ReflectiveTapeContours import REFLECTIVE_TAPE_PARAMS
+
+
+def noisyMask(width, height, density, random):
+    """A binary mask of speckle noise plus a few large blobs."""
+    mask = (random.random((height, width)) < density).astype(numpy.uint8) * 255
+    mask = cv2.dilate(mask, None, iterations=1)
+    for _ in range(5):
+        centre = (int(random.integers(0, width)), int(random.integers(0, height)))
+        cv2.circle(mask, centre, int(random.integers(10, height // 6)), 255, -1)
+    return mask
+
+
+def texturedMask(width, height, random):
+    """Large blobs with speckled holes inside them."""
+    mask = numpy.zeros((height, width), dtype=numpy.uint8)
+    for _ in range(6):
+        centre = (int(random.integers(0, width)), int(random.integers(0, height)))
+        cv2.circle(mask, centre, int(random.integers(height // 8, height // 3)), 255, -1)
+    holes = cv2.dilate((random.random((height, width)) < 0.01).astype(numpy.uint8), None)
+    mask[holes > 0] = 0
+    return mask
+
+
+def timeIt(function, contours, repeats):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        result = function(contours)
+    return (time.perf_counter() - start) / repeats, result
+
+
+if __name__ == "__main__":
+    random = numpy.random.default_rng(4638)
+    repeats = 20
+    solidity_params = dict(RED_BALL_PARAMS["filter_contours"], solidity=[80, 100])
+
+    for width, height in ((320, 240), (640, 480)):
+        for density in (0.002, 0.01, 0.03):
+            mask = noisyMask(width, height, density, random)
+            contours = findContours(mask, False)
+            for name, filter_params in (("red ball", RED_BALL_PARAMS["filter_contours"]),
+                                        ("blue ball", BLUE_BALL_PARAMS["filter_contours"]),
+                                        ("reflective tape", REFLECTIVE_TAPE_PARAMS["filter_contours"]),
+                                        ("red ball, solidity 80-100", solidity_params)):
+                params = dict(FILTER_CONTOURS_DEFAULTS)
+                params.update(filter_params)
+                contour_filter = ContourFilter(params, mask.shape)
+
+                reference, expected = timeIt(lambda c: filterContours(c, params), contours, repeats)
+                vectorized, actual = timeIt(contour_filter, contours, repeats)
+                same = len(expected) == len(actual) and all(a is b for a, b in zip(expected, actual))
+
+                print("{}x{} {} contours, {}: filterContours {:.3f}ms, ContourFilter {:.3f}ms ({:.1f}x), "
+                      "kept {}{}".format(width, height, len(contours), name, 1000 * reference,
+                                          1000 * vectorized, reference / vectorized, len(actual),
+                                          "" if same else " MISMATCH"))
+
+    for width, height in ((320, 240), (640, 480)):
+        mask = texturedMask(width, height, random)
+        params = dict(FILTER_CONTOURS_DEFAULTS)
+        params.update(RED_BALL_PARAMS["filter_contours"])
+        contour_filter = ContourFilter(params, mask.shape)
+        for name, external_only in (("RETR_LIST", False), ("RETR_EXTERNAL", True)):
+            elapsed, kept = timeIt(lambda m: contour_filter(findContours(m, external_only)), mask, repeats)
+            print("{}x{} textured, {}: {} contours, find + filter {:.3f}ms, kept {}".format(
+                width, height, name, len(findContours(mask, external_only)), 1000 * elapsed, len(kept)))
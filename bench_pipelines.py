@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+
+# Times every GRIP pipeline class and runBall/runReflective on synthetic
+# field frames at 320x240 and 640x480, with and without clutter and noise,
+# and saves the results as JSON. Given an earlier results file with
+# --compare, prints how much each timing changed since then.
+#
+#   python3 bench_pipelines.py [--output results.json] [--compare old.json]
+#                              [--clutter 0 20] [--noise 0 8]
+
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import cv2
+import numpy
+from rb_grip_contours import RedBallGripPipeline
+from bb_grip_contours import BlueBallGripPipeline
+from ReflectiveTapeContours import ReflectiveTapeContours
+from vision_loop import runBall, runReflective, BALL_FOCAL_LENGTH, BALL_REAL_WIDTH
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "drive-download-20220129T190028Z-001"))
+from yellow_ball_test import GripPipelineYellow
+from reflective_tape_new import GripPipelineGreen
+
+
+# BGR colours inside each pipeline's HSV thresholds
+RED_BALL = (30, 40, 220)
+BLUE_BALL = (200, 60, 20)
+YELLOW_BALL = (20, 210, 230)
+LIT_TAPE = (170, 255, 160) #the hub's tape under the green ring light
+TARGET_TAPE = (200, 255, 40) #the more saturated target GripPipelineGreen was tuned for
+CARPET = (70, 80, 75)
+
+PIPELINES = (
+    ("RedBallGripPipeline", RedBallGripPipeline),
+    ("BlueBallGripPipeline", BlueBallGripPipeline),
+    ("ReflectiveTapeContours", ReflectiveTapeContours),
+    ("GripPipelineYellow", GripPipelineYellow),
+    ("GripPipelineGreen", GripPipelineGreen),
+)
+
+
+def fieldFrame(width, height, clutter, noise, random):
+    """A synthetic field frame with red, blue and yellow balls, a strip of tape and clutter.
+    Args:
+        width: The frame width.
+        height: The frame height.
+        clutter: The number of random coloured shapes.
+        noise: The standard deviation of the Gaussian noise added to every pixel.
+        random: A numpy.random.Generator.
+    Returns:
+        A BGR numpy.ndarray.
+    """
+    return fieldScene(width, height, clutter, noise, random)[0]
+
+
+def fieldScene(width, height, clutter, noise, random):
+    """Like fieldFrame, but also returns the frame's labels in the evaluate_corpus.py format.
+    Returns:
+        A tuple of the frame and a dict of its "balls" and "tape".
+    """
+    scale = width / 320
+    frame = numpy.empty((height, width, 3), dtype=numpy.uint8)
+    frame[:] = CARPET
+    labels = {"balls": [], "tape": []}
+
+    for _ in range(clutter):
+        colour = tuple(int(c) for c in random.integers(0, 256, 3))
+        x, y = int(random.integers(0, width)), int(random.integers(0, height))
+        size = int(random.integers(4, 30) * scale)
+        if random.random() < 0.5:
+            cv2.rectangle(frame, (x, y), (x + size, y + int(random.integers(4, 30) * scale)), colour, -1)
+        else:
+            cv2.ellipse(frame, (x, y), (size, size // 2), float(random.integers(0, 180)), 0, 360, colour, -1)
+
+    #the tape is a row of short strips along an arc near the top, like the hub
+    centre = width // 2
+    for i in range(-3, 4):
+        x = centre + int(i * 22 * scale)
+        y = int((30 + abs(i) * 3) * scale)
+        cv2.rectangle(frame, (x - int(7 * scale), y), (x + int(7 * scale), y + int(4 * scale)), LIT_TAPE, -1)
+        labels["tape"].append([x - int(7 * scale), y, 2 * int(7 * scale), int(4 * scale)])
+    y = int(60 * scale)
+    cv2.rectangle(frame, (centre - int(40 * scale), y), (centre + int(40 * scale), y + int(6 * scale)), TARGET_TAPE, -1)
+
+    #balls are nearer, so lower and bigger, than the clutter behind them, and don't overlap each other
+    placed = []
+    for name, colour, count in (("red", RED_BALL, 3), ("blue", BLUE_BALL, 3), ("yellow", YELLOW_BALL, 1)):
+        for _ in range(count):
+            for _ in range(20):
+                radius = int(random.integers(10, 35) * scale)
+                x = int(random.integers(radius, width - radius))
+                y = int(random.integers(100 * scale, height - radius))
+                if all(numpy.hypot(x - px, y - py) > radius + pr + 2 for px, py, pr in placed):
+                    break
+            else:
+                continue
+            placed.append((x, y, radius))
+            cv2.circle(frame, (x, y), radius, colour, -1)
+            labels["balls"].append({"colour": name, "x": x, "y": y,
+                                    "distance": BALL_FOCAL_LENGTH * BALL_REAL_WIDTH / (2 * radius)})
+            highlight = tuple(min(255, c + 30) for c in colour)
+            cv2.circle(frame, (x - radius // 3, y - radius // 3), radius // 3, highlight, -1)
+
+    if noise > 0:
+        noisy = frame + random.normal(0, noise, frame.shape)
+        frame = numpy.clip(noisy, 0, 255).astype(numpy.uint8)
+    return frame, labels
+
+
+def contoursOf(pipeline, image):
+    pipeline.process(image)
+    return pipeline.filter_contours_output
+
+
+def timeRuns(function, inputs, repeats):
+    """Calls function on every input repeats times. Returns each call's time in ms and the last results."""
+    times = []
+    results = []
+    for _ in range(repeats):
+        results = []
+        for value in inputs:
+            start = time.perf_counter()
+            results.append(function(value))
+            times.append(1000 * (time.perf_counter() - start))
+    return numpy.array(times), results
+
+
+def summary(times):
+    return {
+        "mean_ms": float(times.mean()),
+        "p50_ms": float(numpy.percentile(times, 50)),
+        "p95_ms": float(numpy.percentile(times, 95)),
+        "min_ms": float(times.min()),
+    }
+
+
+def runBenchmarks(resolutions, clutters, noises, frames, repeats, seed):
+    results = []
+    for width, height in resolutions:
+        for clutter in clutters:
+            for noise in noises:
+                random = numpy.random.default_rng(seed)
+                images = [fieldFrame(width, height, clutter, noise, random) for _ in range(frames)]
+                scene = {"resolution": "{}x{}".format(width, height), "clutter": clutter, "noise": noise}
+
+                outputs = {}
+                for name, pipelineClass in PIPELINES:
+                    pipeline = pipelineClass()
+                    pipeline.process(images[0]) #allocates the buffers outside the timing
+                    times, contours = timeRuns(lambda image: contoursOf(pipeline, image), images, repeats)
+                    outputs[name] = contours
+                    results.append(dict(scene, stage=name, contours=float(numpy.mean([len(c) for c in contours])),
+                                        **summary(times)))
+
+                balls = [c for c in outputs["RedBallGripPipeline"] if len(c) > 0]
+                if balls:
+                    times, _ = timeRuns(lambda contours: runBall(contours, True), balls, repeats)
+                    results.append(dict(scene, stage="runBall", **summary(times)))
+                tape = [c for c in outputs["ReflectiveTapeContours"] if len(c) > 0]
+                if tape:
+                    times, _ = timeRuns(runReflective, tape, repeats)
+                    results.append(dict(scene, stage="runReflective", **summary(times)))
+    return results
+
+
+def resultKey(result):
+    return (result["resolution"], result["clutter"], result["noise"], result["stage"])
+
+
+def compare(results, previous):
+    """Prints each timing's change from an earlier run."""
+    before = {resultKey(result): result for result in previous["results"]}
+    for result in results:
+        old = before.get(resultKey(result))
+        if old is None:
+            continue
+        ratio = result["mean_ms"] / old["mean_ms"] if old["mean_ms"] > 0 else float("inf")
+        print("{} clutter {} noise {}, {}: {:.3f}ms -> {:.3f}ms ({:+.0f}%)".format(
+            result["resolution"], result["clutter"], result["noise"], result["stage"],
+            old["mean_ms"], result["mean_ms"], 100 * (ratio - 1)))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Times the GRIP pipelines on synthetic field frames.")
+    parser.add_argument("--output", default="bench_pipelines.json", help="where the results are saved")
+    parser.add_argument("--compare", help="an earlier results file to compare against")
+    parser.add_argument("--clutter", type=int, nargs="+", default=[0, 20], help="numbers of clutter shapes")
+    parser.add_argument("--noise", type=float, nargs="+", default=[0, 8], help="standard deviations of the noise")
+    parser.add_argument("--frames", type=int, default=8, help="different frames per scene")
+    parser.add_argument("--repeats", type=int, default=10, help="times each frame is processed")
+    parser.add_argument("--seed", type=int, default=4638)
+    args = parser.parse_args()
+
+    results = runBenchmarks(((320, 240), (640, 480)), args.clutter, args.noise, args.frames, args.repeats, args.seed)
+    for result in results:
+        print("{} clutter {} noise {}, {}: mean {:.3f}ms, p50 {:.3f}ms, p95 {:.3f}ms{}".format(
+            result["resolution"], result["clutter"], result["noise"], result["stage"], result["mean_ms"],
+            result["p50_ms"], result["p95_ms"],
+            ", {:.1f} contours".format(result["contours"]) if "contours" in result else ""))
+
+    run = {
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "machine": platform.machine(),
+        "python": platform.python_version(),
+        "opencv": cv2.__version__,
+        "numpy": numpy.__version__,
+        "settings": {"frames": args.frames, "repeats": args.repeats, "seed": args.seed},
+        "results": results,
+    }
+    with open(args.output, "wt", encoding="utf-8") as f:
+        json.dump(run, f, indent=2)
+    print("saved to '{}'".format(args.output))
+
+    if args.compare is not None:
+        with open(args.compare, "rt", encoding="utf-8") as f:
+            compare(results, json.load(f))
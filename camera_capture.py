@@ -0,0 +1,94 @@
+import threading
+import time
+import numpy
+
+# how fast the capture clock offset estimate may creep up per frame, in seconds
+OFFSET_CREEP = 0.0001
+
+
+class CaptureThread(threading.Thread):
+    """Grabs frames from a CvSink on a background thread.
+
+    Only the newest frame is kept. The thread grabs into a preallocated back
+    buffer and swaps it with the front buffer once the grab completes, so
+    the processing loop can copy out the latest frame without waiting for
+    the camera. Grabs time out so a stalled camera is reported through
+    error rather than hanging the thread.
+
+    cscore timestamps are in microseconds on its own clock. captureTime()
+    converts them to time.monotonic() using the smallest difference seen
+    between the two clocks when a frame arrives, which is the offset plus
+    the quickest transfer from the camera.
+    """
+
+    def __init__(self, sink, width, height, timeout=0.225):
+        threading.Thread.__init__(self, name="capture " + sink.getName(), daemon=True)
+        self.sink = sink
+        self.__back = numpy.zeros((height, width, 3), dtype=numpy.uint8)
+        self.__front = numpy.zeros((height, width, 3), dtype=numpy.uint8)
+        self.__timeout = timeout
+        self.__lock = threading.Condition()
+        self.__running = True
+
+        self.timestamp = 0
+        self.frameCount = 0
+        self.error = None
+        self.__offset = None
+
+    def run(self):
+        while self.__running:
+            timestamp, frame = self.sink.grabFrame(self.__back, self.__timeout)
+            if timestamp == 0:
+                self.error = self.sink.getError()
+                continue
+            offset = time.monotonic() - timestamp / 1e6
+            if self.__offset is None or offset < self.__offset + OFFSET_CREEP:
+                self.__offset = offset
+            else:
+                # creep up so a clock step doesn't leave the estimate stuck
+                self.__offset += OFFSET_CREEP
+            if frame is not self.__back:
+                # cscore reallocated because the camera mode differs from
+                # the requested size; keep the new buffer from now on
+                self.__back = frame
+
+            with self.__lock:
+                self.__back, self.__front = self.__front, self.__back
+                self.timestamp = timestamp
+                self.frameCount += 1
+                self.error = None
+                self.__lock.notify_all()
+
+    def stop(self):
+        self.__running = False
+
+    def waitForFrame(self, frameCount, timeout):
+        """Waits until a frame newer than frameCount has arrived.
+        Args:
+            frameCount: The frame count of the last frame that was processed.
+            timeout: The longest time to wait, in seconds.
+        Returns:
+            True if a newer frame is available.
+        """
+        with self.__lock:
+            return self.__lock.wait_for(lambda: self.frameCount != frameCount, timeout)
+
+    def getLatest(self, image):
+        """Copies the newest frame into image.
+        Args:
+            image: A numpy.ndarray to copy the frame into.
+        Returns:
+            A tuple of the capture timestamp, the frame count and the image.
+            The timestamp is 0 until the first frame has arrived.
+        """
+        with self.__lock:
+            if image is None or image.shape != self.__front.shape:
+                image = numpy.empty_like(self.__front)
+            numpy.copyto(image, self.__front)
+            return self.timestamp, self.frameCount, image
+
+    def captureTime(self, timestamp):
+        """Converts a capture timestamp from getLatest() to time.monotonic() seconds."""
+        if timestamp == 0 or self.__offset is None:
+            return None
+        return timestamp / 1e6 + self.__offset
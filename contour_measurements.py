@@ -0,0 +1,83 @@
+import numpy
+
+
+class ContourMeasurements:
+    """Bounding extents, centres and distances for a list of contours, as arrays.
+
+    Element i of every array describes contour i.
+    """
+
+    def __init__(self, contours, focal_length, real_width):
+        """Measures all contours in one pass.
+        Args:
+            contours: Contours as a list of numpy.ndarray.
+            focal_length: The camera focal length in pixels.
+            real_width: The real width of the target, in inches.
+        """
+        self.x_min, self.x_max, self.y_min, self.y_max = contourExtents(contours)
+
+        self.width = self.x_max - self.x_min
+        self.height = self.y_max - self.y_min
+        self.x_center = self.width/2 + self.x_min
+        self.y_center = self.height/2 + self.y_min
+
+        # a zero width contour is infinitely far away, as it was in the old per-contour code
+        with numpy.errstate(divide="ignore"):
+            self.distance = (focal_length*real_width)/self.width.astype(numpy.float64)
+
+    def __len__(self):
+        return len(self.x_min)
+
+
+def concatenateContours(contours):
+    """Packs contours into one point array so they can be measured together.
+    Args:
+        contours: A non-empty list of contours as numpy.ndarray.
+    Returns:
+        A tuple of the (n, 2) point array, the index of each contour's first
+        point and the number of points in each contour.
+    """
+    lengths = numpy.fromiter((len(contour) for contour in contours), dtype=numpy.intp, count=len(contours))
+    starts = numpy.zeros(len(contours), dtype=numpy.intp)
+    numpy.cumsum(lengths[:-1], out=starts[1:])
+    points = numpy.concatenate(contours).reshape(-1, 2)
+    return points, starts, lengths
+
+
+def contourExtents(contours, packed=None):
+    """Finds the minimum and maximum x and y of every contour at once.
+    Args:
+        contours: Contours as a list of numpy.ndarray.
+        packed: The result of concatenateContours(contours), if already computed.
+    Returns:
+        A tuple of x_min, x_max, y_min and y_max arrays.
+    """
+    if len(contours) == 0:
+        empty = numpy.empty(0, dtype=numpy.int32)
+        return empty, empty, empty, empty
+
+    points, starts, lengths = packed if packed is not None else concatenateContours(contours)
+    mins = numpy.minimum.reduceat(points, starts, axis=0)
+    maxs = numpy.maximum.reduceat(points, starts, axis=0)
+    return mins[:,0], maxs[:,0], mins[:,1], maxs[:,1]
+
+
+def nextPoints(starts, lengths):
+    """Returns the index of the point after each point, wrapping around within its contour."""
+    following = numpy.arange(1, lengths.sum() + 1)
+    following[starts + lengths - 1] = starts
+    return following
+
+
+def contourAreas(points, starts, following):
+    """The area of every closed contour, by the shoelace formula cv2.contourArea uses."""
+    x = points[:,0].astype(numpy.int64)
+    y = points[:,1].astype(numpy.int64)
+    cross = x*y[following] - x[following]*y
+    return numpy.abs(numpy.add.reduceat(cross, starts)) / 2.0
+
+
+def contourPerimeters(points, starts, following):
+    """The closed arc length of every contour, like cv2.arcLength(contour, True)."""
+    delta = (points[following] - points).astype(numpy.float64)
+    return numpy.add.reduceat(numpy.hypot(delta[:,0], delta[:,1]), starts)
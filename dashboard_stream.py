@@ -0,0 +1,81 @@
+import threading
+import time
+import cv2
+import numpy
+
+
+class DashboardStream(threading.Thread):
+    """Feeds the dashboard video stream from its own thread.
+
+    The vision loop asks wantsFrame() first and only records annotations and
+    submits a frame when it returns True. That is when a client is connected
+    to the stream and at least 1/max_fps seconds have passed since the last
+    frame. submit() only copies the frame. The thread renders the frame's
+    DisplayList onto it, scales it to the stream size and hands it to the
+    CvSource. A frame that is still waiting when the next one arrives is
+    replaced.
+
+    Set perf to a PerfStats to time drawing and putFrame.
+    """
+
+    def __init__(self, source, width, height, max_fps):
+        threading.Thread.__init__(self, name="dashboard stream", daemon=True)
+        self.source = source
+        self.__size = (width, height)
+        self.__period = 1.0 / max_fps if max_fps > 0 else 0.0
+        self.__next = 0.0
+        self.__back = None
+        self.__front = None
+        self.__back_display = None
+        self.__front_display = None
+        self.__scaled = numpy.zeros((height, width, 3), dtype=numpy.uint8)
+        self.__pending = False
+        self.__lock = threading.Condition()
+        self.__running = True
+        self.perf = None
+
+    def wantsFrame(self):
+        """True if a client is watching and the stream is due another frame."""
+        return self.source.isEnabled() and time.monotonic() >= self.__next
+
+    def submit(self, image, display=None):
+        """Queues a frame for the stream.
+        Args:
+            image: The frame, which is copied.
+            display: A DisplayList to draw on the frame. The stream keeps it.
+        """
+        self.__next = time.monotonic() + self.__period
+        with self.__lock:
+            if self.__back is None or self.__back.shape != image.shape:
+                self.__back = numpy.empty_like(image)
+            numpy.copyto(self.__back, image)
+            self.__back_display = display
+            self.__pending = True
+            self.__lock.notify()
+
+    def run(self):
+        while self.__running:
+            with self.__lock:
+                if not self.__lock.wait_for(lambda: self.__pending, 0.5):
+                    continue
+                self.__back, self.__front = self.__front, self.__back
+                self.__front_display = self.__back_display
+                self.__back_display = None
+                self.__pending = False
+            perf = self.perf
+            if perf is not None:
+                start = time.monotonic()
+            if self.__front_display is not None:
+                self.__front_display.render(self.__front)
+                if perf is not None:
+                    start = perf.lap("draw", start)
+            if self.__front.shape[1::-1] == self.__size:
+                self.source.putFrame(self.__front)
+            else:
+                cv2.resize(self.__front, self.__size, dst=self.__scaled, interpolation=cv2.INTER_AREA)
+                self.source.putFrame(self.__scaled)
+            if perf is not None:
+                perf.lap("put frame", start)
+
+    def stop(self):
+        self.__running = False
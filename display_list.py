@@ -0,0 +1,50 @@
+import cv2
+import numpy
+
+
+class DisplayList:
+    """Annotations recorded during detection and drawn onto a frame later.
+
+    Recording only keeps references to the measurements, so detection pays
+    nothing for annotations on frames that are never streamed. render()
+    draws everything of a kind in one OpenCV call.
+    """
+
+    def __init__(self):
+        self.__points = []
+        self.__boxes = []
+        self.__circles = []
+        self.__lines = []
+
+    def contourPoints(self, contours, colour, thickness):
+        """Marks every point of the contours, as drawContours(image, contour, -1, ...) did."""
+        if len(contours) > 0:
+            self.__points.append((contours, colour, thickness))
+
+    def boxes(self, measurements, colour, thickness):
+        """Outlines the bounding box of every contour in a ContourMeasurements."""
+        if len(measurements) > 0:
+            self.__boxes.append((measurements, colour, thickness))
+
+    def circle(self, centre, radius, colour, thickness):
+        self.__circles.append((centre, radius, colour, thickness))
+
+    def line(self, start, end, colour, thickness):
+        self.__lines.append((start, end, colour, thickness))
+
+    def render(self, image):
+        """Draws the recorded annotations onto image."""
+        for contours, colour, thickness in self.__points:
+            # each point is drawn as a one point contour
+            cv2.drawContours(image, numpy.concatenate(contours), -1, colour, thickness)
+        for measurements, colour, thickness in self.__boxes:
+            corners = numpy.stack((
+                numpy.stack((measurements.x_max, measurements.y_max), axis=1),
+                numpy.stack((measurements.x_max, measurements.y_min), axis=1),
+                numpy.stack((measurements.x_min, measurements.y_min), axis=1),
+                numpy.stack((measurements.x_min, measurements.y_max), axis=1)), axis=1).astype(numpy.int32)
+            cv2.polylines(image, list(corners.reshape(-1, 4, 1, 2)), True, colour, thickness)
+        for centre, radius, colour, thickness in self.__circles:
+            cv2.circle(image, (int(centre[0]), int(centre[1])), radius=radius, color=colour, thickness=thickness)
+        for start, end, colour, thickness in self.__lines:
+            cv2.line(image, start, end, colour, thickness)
@@ -7,6 +7,7 @@
 #----------------------------------------------------------------------------
 
 import json
+import os
 import time
 import sys
 
@@ -16,9 +17,12 @@ import cv2
 import numpy
 import math
 
+# the pipeline engine and input cache live in the repository root
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
 
 from reflective_tape_new import GripPipelineGreen
 from yellow_ball_test import GripPipelineYellow
+from nt_inputs import InputCache
 
 
 #   JSON format:
@@ -350,13 +354,15 @@ def getValuesYellow(image):
         image = cv2.putText(image, "Distance={}in".format(inchesY.astype(numpy.int64)),((x_center_yellow - 40).astype(numpy.int64), (y_center_yellow + 40).astype(numpy.int64)), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 0, 255), 1)
 
         if (inchesY < inchesZ):
-            sd.putNumber('Center X Yellow', x_center_yellow)
-            sd.putNumber('Center Y Yellow', y_center_yellow)
-
-            sd.putNumber('Yellow Distance', inchesY)
-
+            closest = (x_center_yellow, y_center_yellow, inchesY)
             inchesZ = inchesY
 
+    #only the closest ball is published, once, so the values all come from the same ball
+    if (inchesZ < 10000):
+        sd.putNumber('Center X Yellow', closest[0])
+        sd.putNumber('Center Y Yellow', closest[1])
+        sd.putNumber('Yellow Distance', closest[2])
+
     return image
 
 
@@ -407,6 +413,8 @@ if __name__ == "__main__":
     # loop forever
 
     sd = ntinst.getTable('SmartDashboard')
+    inputs = InputCache(sd)
+    inputs.addNumber("cameraChooser", "Camera chooser", 1)
 
     while True:
 
@@ -460,7 +468,7 @@ if __name__ == "__main__":
         #END OF IF STATEMENTS/SEND DATA
 
 
-        camera_chooser = sd.getNumber("Camera chooser", 1) ## Starts on back camera to pick up balls
+        camera_chooser = inputs.cameraChooser ## Starts on back camera to pick up balls
 
         if (camera_chooser == 1):
             dashSource1.putFrame(image_Y)
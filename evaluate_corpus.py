@@ -0,0 +1,333 @@
+#!/usr/bin/env python3
+
+# Scores vision configurations on a labelled corpus of frames. For each
+# configuration it reports how well our alliance's balls and the hub's tape
+# are found, how far the published Ball and Green values are from the
+# labels, and what each frame costs. With --output, every run is appended
+# to a JSON file, so configurations can be compared on speed against accuracy.
+#
+#   python3 evaluate_corpus.py <corpus> [--config frc.json ...] [--output runs.json]
+#   python3 evaluate_corpus.py <corpus> --synthetic 40    # writes a synthetic corpus first
+#
+# A corpus is a directory of frames with a labels.json:
+#   {
+#       "frames": [
+#           {
+#               "image": <file name of the frame>
+#               "sequence": <name of the run of frames it belongs to> // optional
+#               "alliance": <"red" or "blue">
+#               "inputs": {<robot input key>: <value>}     // optional, e.g. {"isAiming": true}
+#               "balls": [                                // every ball in the frame
+#                   {
+#                       "colour": <"red", "blue" or "yellow">
+#                       "x": <centre x>
+#                       "y": <centre y>
+#                       "distance": <distance from the camera, in>
+#                   }
+#               ]
+#               "tape": [                                 // every lit strip of hub tape
+#                   [x, y, width, height]
+#               ]
+#           }
+#       ]
+#   }
+# Positions are in pixels of the frame. Frames of another size than the
+# capture size are scaled to it, and their labels with them.
+#
+# Frames are in capture order. Each run of frames with the same sequence
+# goes through its own VisionLoop, fed by ReplaySources at --fps, so the
+# tracking window, ball tracker, extrapolation and scheduler all act on
+# the scores as they would on the robot. Robot inputs set on a frame stay
+# set for the rest of its sequence. The published target and Green X are
+# scored on every frame, even when the pipeline skipped it. Ball and tape
+# detections are only scored on the frames their pipeline ran on.
+
+import argparse
+import json
+import os
+import sys
+import time
+import cv2
+import numpy
+from ball_tracker import assignDetections
+from bench_pipelines import fieldScene
+from contour_measurements import ContourMeasurements
+from replay import ReplaySource, ReplayTable, ReplayNetworkTables
+from vision_publisher import SNAPSHOT_FIELDS
+from vision_loop import (VisionLoop, VisionSettings, readVisionSettings, configCameraNames, cameraRegions,
+                         VIDEO_WIDTH, VIDEO_HEIGHT, BALL_FOCAL_LENGTH, BALL_REAL_WIDTH, BALL_MIN_Y, BALL_MAX_Y,
+                         REFLECTIVE_FOCAL_LENGTH, REFLECTIVE_REAL_WIDTH)
+
+
+LABELS_FILE = "labels.json"
+
+
+def readCorpus(path):
+    """Reads a corpus.
+    Args:
+        path: The corpus directory.
+    Returns:
+        A list of (image, labels) tuples, with every image and its labels at the capture size.
+    """
+    with open(os.path.join(path, LABELS_FILE), "rt", encoding="utf-8") as f:
+        corpus = json.load(f)
+    frames = []
+    for labels in corpus["frames"]:
+        image = cv2.imread(os.path.join(path, labels["image"]), cv2.IMREAD_COLOR)
+        if image is None:
+            raise OSError("could not read '{}'".format(labels["image"]))
+        scale_x = VIDEO_WIDTH / image.shape[1]
+        scale_y = VIDEO_HEIGHT / image.shape[0]
+        if image.shape[1::-1] != (VIDEO_WIDTH, VIDEO_HEIGHT):
+            image = cv2.resize(image, (VIDEO_WIDTH, VIDEO_HEIGHT), interpolation=cv2.INTER_AREA)
+        balls = [dict(ball, x=ball["x"] * scale_x, y=ball["y"] * scale_y) for ball in labels.get("balls", [])]
+        tape = [[x * scale_x, y * scale_y, width * scale_x, height * scale_y]
+                for x, y, width, height in labels.get("tape", [])]
+        frames.append((image, {"sequence": labels.get("sequence"), "alliance": labels["alliance"],
+                               "inputs": labels.get("inputs", {}), "balls": balls, "tape": tape}))
+    return frames
+
+
+def writeSyntheticCorpus(path, count, seed=4638):
+    """Writes a corpus of count synthetic frames from bench_pipelines, alternating alliances.
+
+    The frames are unrelated scenes, so each one is its own sequence.
+    """
+    os.makedirs(path, exist_ok=True)
+    random = numpy.random.default_rng(seed)
+    frames = []
+    for i in range(count):
+        image, labels = fieldScene(VIDEO_WIDTH, VIDEO_HEIGHT, 10, 4, random)
+        name = "{:04d}.png".format(i)
+        cv2.imwrite(os.path.join(path, name), image)
+        frames.append(dict(labels, image=name, sequence=name, alliance="red" if i % 2 == 0 else "blue"))
+    with open(os.path.join(path, LABELS_FILE), "wt", encoding="utf-8") as f:
+        json.dump({"frames": frames}, f, indent=2)
+
+
+def boxOverlaps(boxes, others):
+    """The intersection over union of every pair of (x, y, width, height) boxes, as a (boxes, others) array."""
+    boxes = numpy.asarray(boxes, dtype=numpy.float64).reshape(-1, 4)
+    others = numpy.asarray(others, dtype=numpy.float64).reshape(-1, 4)
+    x_min = numpy.maximum(boxes[:, None, 0], others[None, :, 0])
+    y_min = numpy.maximum(boxes[:, None, 1], others[None, :, 1])
+    x_max = numpy.minimum(boxes[:, None, 0] + boxes[:, None, 2], others[None, :, 0] + others[None, :, 2])
+    y_max = numpy.minimum(boxes[:, None, 1] + boxes[:, None, 3], others[None, :, 1] + others[None, :, 3])
+    intersection = numpy.maximum(x_max - x_min, 0) * numpy.maximum(y_max - y_min, 0)
+    union = (boxes[:, None, 2] * boxes[:, None, 3]) + (others[None, :, 2] * others[None, :, 3]) - intersection
+    return numpy.where(union > 0, intersection / numpy.maximum(union, 1e-9), 0)
+
+
+def ratio(numerator, denominator):
+    return numerator / denominator if denominator > 0 else None
+
+
+def statistics(values):
+    if len(values) == 0:
+        return {"mean": None, "p95": None}
+    return {"mean": float(numpy.mean(values)), "p95": float(numpy.percentile(values, 95))}
+
+
+def sequences(frames):
+    """Splits a corpus into runs of consecutive frames with the same sequence."""
+    runs = []
+    for frame in frames:
+        if not runs or runs[-1][-1][1]["sequence"] != frame[1]["sequence"]:
+            runs.append([])
+        runs[-1].append(frame)
+    return runs
+
+
+def evaluate(settings, frames, ballRoi=None, reflectiveRoi=None, fps=30, max_centre_error=12, min_overlap=0.5):
+    """Scores one configuration on a corpus.
+    Args:
+        settings: A VisionSettings.
+        frames: A corpus from readCorpus().
+        ballRoi: The region of the frame the ball pipelines search, or None.
+        reflectiveRoi: The region of the frame the tape pipeline searches, or None.
+        fps: The frame rate the corpus was captured at.
+        max_centre_error: A ball found further than this from a labelled ball, in pixels, is a false detection.
+        min_overlap: A strip of tape found overlapping a labelled one by less than this is a false detection.
+    Returns:
+        A dict of the scores.
+    """
+    ball_counts = [0, 0, 0] #found, false, missed
+    centre_errors = []
+    distance_errors = []
+    target_counts = [0, 0, 0, 0] #right ball, wrong ball, false, missed
+    target_x_errors = []
+    target_distance_errors = []
+    tape_counts = [0, 0, 0]
+    green_x_errors = []
+    costs = []
+    ball_frames = 0
+    tape_frames = 0
+
+    for sequence in sequences(frames):
+        #both cameras see the corpus frames, so the ball and tape pipelines run on the same frame
+        images = [image for image, labels in sequence]
+        table = ReplayTable()
+        loop = VisionLoop(settings, ReplaySource(images, VIDEO_WIDTH, VIDEO_HEIGHT, fps),
+                          ReplaySource(images, VIDEO_WIDTH, VIDEO_HEIGHT, fps), table, ReplayNetworkTables(table),
+                          ballRoi, reflectiveRoi)
+        for image, labels in sequence:
+            table.setInput("isRedAlliance", labels["alliance"] == "red")
+            for key, value in labels["inputs"].items():
+                table.setInput(key, value)
+            start = time.monotonic()
+            loop.step()
+            costs.append(1000 * (time.monotonic() - start))
+            published = dict(zip(SNAPSHOT_FIELDS, loop.publisher.snapshot))
+
+            ours = [ball for ball in labels["balls"] if ball["colour"] == labels["alliance"]]
+            label_x = numpy.array([ball["x"] for ball in ours], dtype=numpy.float64)
+            label_y = numpy.array([ball["y"] for ball in ours], dtype=numpy.float64)
+            label_distance = numpy.array([ball["distance"] for ball in ours], dtype=numpy.float64)
+
+            #every ball of our colour found, matched to the labels by centre
+            if loop.ball_contours is not None:
+                ball_frames += 1
+                balls = ContourMeasurements(loop.ball_contours, BALL_FOCAL_LENGTH, BALL_REAL_WIDTH)
+                cost = numpy.hypot(label_x[:, None] - balls.x_center[None, :],
+                                   label_y[:, None] - balls.y_center[None, :])
+                pairs = assignDetections(cost, max_centre_error)
+                ball_counts[0] += len(pairs)
+                ball_counts[1] += len(balls) - len(pairs)
+                ball_counts[2] += len(ours) - len(pairs)
+                for label, found in pairs:
+                    centre_errors.append(cost[label, found])
+                    distance_errors.append(abs(balls.distance[found] - label_distance[label]))
+
+            #the published target should be the closest labelled ball in the pick up band
+            target_x = published["Ball X"] * VIDEO_WIDTH
+            target_y = published["Ball Y"] * VIDEO_HEIGHT
+            target_distance = published["Ball Distance"]
+            band = numpy.flatnonzero((label_y > BALL_MIN_Y) & (label_y < BALL_MAX_Y))
+            if len(band) == 0:
+                if target_distance != -1:
+                    target_counts[2] += 1
+            elif target_distance == -1:
+                target_counts[3] += 1
+            else:
+                closest = band[numpy.argmin(label_distance[band])]
+                if numpy.hypot(target_x - label_x[closest], target_y - label_y[closest]) > max_centre_error:
+                    target_counts[1] += 1
+                else:
+                    target_counts[0] += 1
+                    target_x_errors.append(abs(target_x - label_x[closest]) / VIDEO_WIDTH) #in Ball X units
+                    target_distance_errors.append(abs(target_distance - label_distance[closest]))
+
+            #every strip of tape found, matched to the labels by overlap
+            if loop.tape_contours is not None:
+                tape_frames += 1
+                strips = ContourMeasurements(loop.tape_contours, REFLECTIVE_FOCAL_LENGTH, REFLECTIVE_REAL_WIDTH)
+                found_boxes = numpy.stack((strips.x_min, strips.y_min, strips.width, strips.height), axis=1)
+                overlaps = boxOverlaps(labels["tape"], found_boxes)
+                pairs = assignDetections(1 - overlaps, 1 - min_overlap)
+                tape_counts[0] += len(pairs)
+                tape_counts[1] += len(strips) - len(pairs)
+                tape_counts[2] += len(labels["tape"]) - len(pairs)
+            if published["Green X"] != -1 and len(labels["tape"]) > 0:
+                label_centre = numpy.mean([x + width / 2 for x, y, width, height in labels["tape"]])
+                green_x_errors.append(abs(published["Green X"] - label_centre / VIDEO_WIDTH)) #in Green X units
+
+    found, false, missed = ball_counts
+    tape_found, tape_false, tape_missed = tape_counts
+    return {
+        "frames": len(frames),
+        "ball": {
+            "frames": ball_frames,
+            "precision": ratio(found, found + false),
+            "recall": ratio(found, found + missed),
+            "centre error px": statistics(centre_errors),
+            "distance error in": statistics(distance_errors),
+        },
+        "target": {
+            "right": target_counts[0],
+            "wrong ball": target_counts[1],
+            "false": target_counts[2],
+            "missed": target_counts[3],
+            "x error": statistics(target_x_errors),
+            "distance error in": statistics(target_distance_errors),
+        },
+        "tape": {
+            "frames": tape_frames,
+            "precision": ratio(tape_found, tape_found + tape_false),
+            "recall": ratio(tape_found, tape_found + tape_missed),
+            "green x error": statistics(green_x_errors),
+        },
+        "cost ms": statistics(costs),
+    }
+
+
+def formatScore(value, digits=3):
+    return "n/a" if value is None else "{:.{}f}".format(value, digits)
+
+
+def printScores(name, scores):
+    ball = scores["ball"]
+    target = scores["target"]
+    tape = scores["tape"]
+    print("{} ({} frames):".format(name, scores["frames"]))
+    print("  balls ({} frames run): precision {}, recall {}, centre error {}px (p95 {}), distance error {}in (p95 {})".format(
+        ball["frames"], formatScore(ball["precision"]), formatScore(ball["recall"]),
+        formatScore(ball["centre error px"]["mean"], 2), formatScore(ball["centre error px"]["p95"], 2),
+        formatScore(ball["distance error in"]["mean"], 2), formatScore(ball["distance error in"]["p95"], 2)))
+    print("  target: {} right, {} wrong ball, {} false, {} missed, Ball X error {}, Ball Distance error {}in".format(
+        target["right"], target["wrong ball"], target["false"], target["missed"],
+        formatScore(target["x error"]["mean"], 4), formatScore(target["distance error in"]["mean"], 2)))
+    print("  tape ({} frames run): precision {}, recall {}, Green X error {}".format(
+        tape["frames"], formatScore(tape["precision"]), formatScore(tape["recall"]), formatScore(tape["green x error"]["mean"], 4)))
+    print("  cost: mean {}ms, p95 {}ms".format(
+        formatScore(scores["cost ms"]["mean"], 2), formatScore(scores["cost ms"]["p95"], 2)))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scores vision configurations on a labelled corpus.")
+    parser.add_argument("corpus", help="the corpus directory")
+    parser.add_argument("--config", action="append", default=[],
+                        help="a frc.json whose \"vision\" settings are scored, the defaults if not given")
+    parser.add_argument("--camera-names", nargs=2,
+                        help="the ball and reflective tape cameras' names in the config's roi, "
+                             "the first two of its \"cameras\" if not given")
+    parser.add_argument("--fps", type=float, default=30, help="frame rate the corpus was captured at")
+    parser.add_argument("--max-centre-error", type=float, default=12,
+                        help="furthest a found ball may be from a labelled one, in pixels")
+    parser.add_argument("--min-overlap", type=float, default=0.5,
+                        help="least intersection over union of found and labelled tape")
+    parser.add_argument("--output", help="a JSON file the scores are appended to")
+    parser.add_argument("--synthetic", type=int, metavar="FRAMES",
+                        help="first write a synthetic corpus of this many frames to the corpus directory")
+    args = parser.parse_args()
+
+    if args.synthetic is not None:
+        writeSyntheticCorpus(args.corpus, args.synthetic)
+    frames = readCorpus(args.corpus)
+
+    configs = [(None, VisionSettings(), (None, None))]
+    if args.config:
+        configs = []
+        for path in args.config:
+            with open(path, "rt", encoding="utf-8") as f:
+                config = json.load(f)
+            try:
+                settings = readVisionSettings(config.get("vision", {}))
+                regions = cameraRegions(settings, args.camera_names or configCameraNames(config))
+                configs.append((path, settings, regions))
+            except ValueError as err:
+                print("config error in '{}': {}".format(path, err), file=sys.stderr)
+                sys.exit(1)
+
+    runs = []
+    for path, settings, (ballRoi, reflectiveRoi) in configs:
+        scores = evaluate(settings, frames, ballRoi, reflectiveRoi, args.fps, args.max_centre_error, args.min_overlap)
+        printScores(path or "defaults", scores)
+        runs.append(dict(scores, config=path, corpus=args.corpus, time=time.strftime("%Y-%m-%dT%H:%M:%S")))
+
+    if args.output is not None:
+        previous = []
+        if os.path.exists(args.output):
+            with open(args.output, "rt", encoding="utf-8") as f:
+                previous = json.load(f)
+        with open(args.output, "wt", encoding="utf-8") as f:
+            json.dump(previous + runs, f, indent=2)
@@ -0,0 +1,215 @@
+import os
+import xml.etree.ElementTree as ElementTree
+
+from grip_pipeline import GripPipeline
+
+
+# socket index -> filter_contours parameter name, in the order GRIP lays them out
+FILTER_CONTOURS_SOCKETS = {
+    1: "min_area",
+    2: "min_perimeter",
+    3: "min_width",
+    4: "max_width",
+    5: "min_height",
+    6: "max_height",
+    7: "solidity",
+    8: "max_vertices",
+    9: "min_vertices",
+    10: "min_ratio",
+    11: "max_ratio",
+}
+
+# GRIP writes the grip: prefix without declaring it, which ElementTree rejects
+GRIP_NAMESPACE = "https://github.com/WPIRoboticsProjects/GRIP"
+NS = "{" + GRIP_NAMESPACE + "}"
+
+# parsed parameter sets keyed on (path, modification time)
+_paramsCache = {}
+
+
+def parseValue(value):
+    """Converts a GRIP <value> element to a python value.
+    Args:
+        value: An ElementTree element, or None if the socket has no value.
+    Returns:
+        A list of floats for ranges, a bool, a float or the raw string.
+    """
+    if value is None:
+        return None
+    children = list(value)
+    if children:
+        return [float(child.text or "") for child in children]
+    text = (value.text or "").strip()
+    if text in ("true", "false"):
+        return text == "true"
+    try:
+        return float(text)
+    except ValueError:
+        return text
+
+
+def section(root, tag, path):
+    """Finds a required top level element of a .grip project, raising ValueError if it is missing."""
+    element = root.find(tag)
+    if element is None:
+        raise ValueError("'{}': has no <{}>".format(path, tag))
+    return element
+
+
+def intAttribute(element, name, path):
+    """Reads a required integer attribute, raising ValueError if it is missing or not an integer."""
+    try:
+        return int(element.get(name))
+    except (TypeError, ValueError):
+        raise ValueError("'{}': <{}> needs an integer {} attribute".format(
+            path, element.tag.replace(NS, "grip:"), name))
+
+
+def readGripFile(path):
+    """Reads the steps and connections of a .grip project.
+    Args:
+        path: The path of the .grip file.
+    Returns:
+        A tuple of the steps, as a list of (name, {socket: value}), and the
+        connections, as a dict of (step, socket) -> ("source" or "step", index).
+    Raises:
+        ValueError: If the file is missing part of the project structure.
+    """
+    with open(path, "rt", encoding="utf-8") as f:
+        text = f.read()
+    text = text.replace("<grip:Pipeline", '<grip:Pipeline xmlns:grip="{}"'.format(GRIP_NAMESPACE), 1)
+    root = ElementTree.fromstring(text)
+
+    steps = []
+    for step in section(root, "steps", path):
+        inputs = {}
+        for socket in step.findall(NS + "Input"):
+            inputs[intAttribute(socket, "socket", path)] = parseValue(socket.find("value"))
+        steps.append((step.get("name", ""), inputs))
+
+    connections = {}
+    for connection in section(root, "connections", path):
+        output = connection.find(NS + "Output")
+        input = connection.find(NS + "Input")
+        if output is None or input is None:
+            raise ValueError("'{}': every connection needs an Output and an Input".format(path))
+        if output.get("source") is not None:
+            producer = ("source", intAttribute(output, "source", path))
+        else:
+            producer = ("step", intAttribute(output, "step", path))
+        connections[(intAttribute(input, "step", path), intAttribute(input, "socket", path))] = producer
+
+    return steps, connections
+
+
+def gripParams(path):
+    """Builds a GripPipeline parameter set from a .grip project.
+
+    The result is cached until the file is modified.
+    Args:
+        path: The path of the .grip file.
+    Returns:
+        A parameter set dict, see GripPipeline.
+    """
+    path = os.path.abspath(path)
+    key = (path, os.stat(path).st_mtime_ns)
+    if key not in _paramsCache:
+        params = buildParams(path, *readGripFile(path))
+        for old in [old for old in _paramsCache if old[0] == path]:
+            del _paramsCache[old]
+        _paramsCache[key] = params
+    return _paramsCache[key]
+
+
+def buildParams(path, steps, connections):
+    """Turns the step graph of a .grip project into a GripPipeline parameter set.
+
+    Every socket that is read is checked, so a half-edited file raises
+    ValueError instead of building parameters process() would fail on.
+    """
+    def unsupported(message):
+        return ValueError("'{}': {}".format(path, message))
+
+    def socket(name, inputs, index, kind):
+        """inputs[index], checked to be a "number", a "range" of two numbers or a "bool"."""
+        value = inputs.get(index)
+        if kind == "range":
+            valid = isinstance(value, list) and len(value) == 2
+        elif kind == "bool":
+            valid = isinstance(value, bool)
+        else:
+            valid = isinstance(value, float)
+        if not valid:
+            raise unsupported("{} socket {} needs a {}, not {!r}".format(name, index, kind, value))
+        return value
+
+    params = {"morphology": [], "mask": False}
+    binary = None # the step whose output is the current binary image
+    contours = None
+    for index, (name, inputs) in enumerate(steps):
+        source = connections.get((index, 0))
+        if name == "HSV Threshold":
+            if source != ("source", 0):
+                raise unsupported("HSV Threshold must read the camera")
+            params["hsv_threshold"] = {channel: socket(name, inputs, i, "range")
+                                       for i, channel in ((1, "hue"), (2, "saturation"), (3, "value"))}
+            binary = index
+        elif name in ("CV erode", "CV dilate"):
+            if source != ("step", binary):
+                raise unsupported("{} must follow the threshold or another erode/dilate".format(name))
+            if inputs.get(1) is not None or inputs.get(2) is not None:
+                raise unsupported("{} kernel and anchor are not supported".format(name))
+            if inputs.get(4, "BORDER_CONSTANT") != "BORDER_CONSTANT":
+                raise unsupported("{} only supports BORDER_CONSTANT".format(name))
+            params["morphology"].append((name[3:], socket(name, inputs, 3, "number")))
+            binary = index
+        elif name == "Mask":
+            if source != ("source", 0) or connections.get((index, 1)) != ("step", binary):
+                raise unsupported("Mask must mask the camera with the last binary image")
+            params["mask"] = True
+        elif name == "Find Contours":
+            if source != ("step", binary):
+                raise unsupported("Find Contours must read the last binary image")
+            params["find_contours"] = {"external_only": socket(name, inputs, 1, "bool")}
+            contours = index
+        elif name == "Filter Contours":
+            if source != ("step", contours):
+                raise unsupported("Filter Contours must read Find Contours")
+            params["filter_contours"] = {key: socket(name, inputs, i, "range" if key == "solidity" else "number")
+                                         for i, key in FILTER_CONTOURS_SOCKETS.items()}
+        elif name.startswith("NTPublish"):
+            # the vision loop publishes its own results
+            continue
+        else:
+            raise unsupported("step '{}' is not supported".format(name))
+
+    if "hsv_threshold" not in params or "filter_contours" not in params:
+        raise unsupported("needs HSV Threshold, Find Contours and Filter Contours steps")
+    return params
+
+
+class GripFilePipeline(GripPipeline):
+    """
+    A GripPipeline whose parameters are read from a .grip project.
+
+    Call reload() to pick up edits to the file without restarting.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        GripPipeline.__init__(self, gripParams(path))
+
+    def reload(self):
+        """Re-reads the .grip file if it has changed.
+        Returns:
+            True if the parameters changed.
+        """
+        try:
+            params = gripParams(self.path)
+        except (OSError, ValueError, ElementTree.ParseError) as err:
+            print("could not reload '{}': {}".format(self.path, err))
+            return False
+        if params == self.params:
+            return False
+        self.setParams(params)
+        return True
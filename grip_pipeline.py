@@ -0,0 +1,446 @@
+import threading
+import time
+import cv2
+import numpy
+from hsv_lut import HsvLookupThreshold
+from contour_measurements import concatenateContours, contourExtents, nextPoints, contourAreas, contourPerimeters
+
+
+FILTER_CONTOURS_DEFAULTS = {
+    "min_area": 0.0,
+    "min_perimeter": 0.0,
+    "min_width": 0.0,
+    "max_width": 1000.0,
+    "min_height": 0.0,
+    "max_height": 1000.0,
+    "solidity": [0, 100],
+    "max_vertices": 1000000.0,
+    "min_vertices": 0.0,
+    "min_ratio": 0.0,
+    "max_ratio": 1000.0,
+}
+
+
+class ColourSpaceCache:
+    """Shares one HSV conversion of each frame between pipelines.
+
+    Conversions are keyed on the source buffer, so pipelines cropped to the
+    same region share one too. The vision loop grabs every frame into the
+    same buffer, so call newFrame() after each grab to drop the cached
+    conversions. Their buffers are kept and reused for the next frame.
+    """
+
+    def __init__(self):
+        self.__entries = {}
+        self.__free = []
+        self.__lock = threading.Lock()
+
+    def newFrame(self):
+        with self.__lock:
+            self.__free.extend(store for store, hsv in self.__entries.values())
+            self.__entries.clear()
+
+    def hsv(self, source):
+        """Returns the HSV conversion of source, converting it at most once per frame.
+        Args:
+            source: A BGR numpy.ndarray.
+        Returns:
+            An HSV numpy.ndarray owned by the cache.
+        """
+        key = (source.__array_interface__["data"][0], source.shape)
+        # pipelines on the same camera may run on different worker threads
+        with self.__lock:
+            entry = self.__entries.get(key)
+            if entry is None:
+                size = source.shape[0] * source.shape[1] * 3
+                # picked by index: list.remove() would compare the buffers with numpy ==
+                fits = [i for i, store in enumerate(self.__free) if store.size >= size]
+                if fits:
+                    store = self.__free.pop(min(fits, key=lambda i: self.__free[i].size))
+                else:
+                    store = numpy.empty(size, dtype=numpy.uint8)
+                hsv = regionBuffer(store, source.shape)
+                cv2.cvtColor(source, cv2.COLOR_BGR2HSV, dst=hsv)
+                entry = (store, hsv)
+                self.__entries[key] = entry
+            return entry[1]
+
+
+def regionBuffer(store, shape):
+    """A contiguous view of the start of a flat buffer with the given shape.
+
+    Buffers sized for the whole frame can then hold any region of it without
+    reallocating when the region changes.
+    """
+    return store[:numpy.prod(shape)].reshape(shape)
+
+
+def clampRegion(roi, shape):
+    """Clips an (x, y, width, height) region of interest to an image's bounds."""
+    height, width = shape[:2]
+    x = min(max(int(roi[0]), 0), width)
+    y = min(max(int(roi[1]), 0), height)
+    return x, y, min(int(roi[0] + roi[2]), width) - x, min(int(roi[1] + roi[3]), height) - y
+
+
+class GripPipeline:
+    """
+    An OpenCV pipeline with the same steps GRIP generates, built from a parameter set.
+
+    The parameter set is a dict:
+        "hsv_threshold": {"hue": [min, max], "saturation": [min, max], "value": [min, max],
+                          "lookup_table": True to threshold through an HsvLookupThreshold,
+                                          which useLookupTable() can also turn on}
+        "morphology": a list of ("erode" or "dilate", iterations) applied in order
+        "mask": True to make mask_output available
+        "find_contours": {"external_only": bool,
+                          "holes": optional [min, max] number of holes an outer contour must have,
+                          "min_hole_area": holes smaller than this are not counted}
+        "filter_contours": any keys of FILTER_CONTOURS_DEFAULTS
+
+    Image buffers are allocated once per input resolution and reused on every
+    call to process(), so the image outputs are overwritten by the next frame.
+
+    Nothing in the vision loop uses mask_output, so it is only computed when
+    it is read. Read it before drawing on the source frame.
+
+    Set colour_cache to a ColourSpaceCache shared with the other pipelines
+    on the same camera to convert each frame to HSV only once.
+
+    Set roi to an (x, y, width, height) region to only process that part of
+    the frame. The image outputs then cover just the region, but contours
+    are still in full frame coordinates.
+
+    Set perf to a PerfStats (or a scope of one) to time each step.
+    """
+
+    def __init__(self, params):
+        """initializes all outputs to None and applies the parameter set
+        """
+        self.hsv_threshold_output = None
+        self.cv_erode_output = None
+        self.cv_dilate_output = None
+        self.find_contours_output = None
+        self.filter_contours_output = None
+
+        self.colour_cache = None
+        self.roi = None
+        self.perf = None
+        self.__shape = None
+        self.__mask_source = None
+        self.__mask_mask = None
+        self.__masked = None
+        self.__lookup = None
+        self.__always_lookup = False
+        self.setParams(params)
+
+    def setParams(self, params):
+        """Replaces the parameter set. Takes effect on the next process() call."""
+        hsv = params["hsv_threshold"]
+        self.__hsv_low = (hsv["hue"][0], hsv["saturation"][0], hsv["value"][0])
+        self.__hsv_high = (hsv["hue"][1], hsv["saturation"][1], hsv["value"][1])
+        if hsv.get("lookup_table", False) or self.__always_lookup:
+            if self.__lookup is None:
+                self.__lookup = HsvLookupThreshold()
+            self.__lookup.setBounds(self.__hsv_low, self.__hsv_high)
+        else:
+            self.__lookup = None
+
+        # GRIP rounds the iteration count to the nearest integer
+        self.__morphology = []
+        for operation, iterations in params.get("morphology", []):
+            if operation not in ("erode", "dilate"):
+                raise ValueError("unknown morphology operation '{}'".format(operation))
+            self.__morphology.append((operation, int(iterations + 0.5)))
+
+        self.__mask_enabled = params.get("mask", True)
+        find_contours = params.get("find_contours", {})
+        self.__external_only = find_contours.get("external_only", False)
+        self.__holes = find_contours.get("holes")
+        self.__min_hole_area = find_contours.get("min_hole_area", 0)
+
+        self.__filter = dict(FILTER_CONTOURS_DEFAULTS)
+        self.__filter.update(params.get("filter_contours", {}))
+
+        self.params = params
+        self.__shape = None
+
+    def useLookupTable(self, enabled):
+        """Thresholds through an HsvLookupThreshold whatever the parameter set says.
+
+        Unlike "lookup_table" in the parameters, this stays set when the
+        parameters are replaced.
+        """
+        self.__always_lookup = enabled
+        self.setParams(self.params)
+
+    def __allocate(self, shape):
+        # sized for the whole frame; regions of interest use views of the start of each buffer
+        height, width = shape[:2]
+        self.__hsv_store = None
+        self.__threshold_store = numpy.empty(height * width, dtype=numpy.uint8)
+        self.__morph_stores = [numpy.empty(height * width, dtype=numpy.uint8) for _ in range(2)]
+        self.__masked_store = None
+        self.__contour_filter = ContourFilter(self.__filter, shape)
+        self.__shape = shape
+
+    def process(self, source0):
+        """
+        Runs the pipeline and sets all outputs to new values.
+        """
+        perf = self.perf
+        if perf is not None:
+            start = time.monotonic()
+        if source0.shape != self.__shape:
+            self.__allocate(source0.shape)
+
+        offset = (0, 0)
+        if self.roi is not None:
+            x, y, width, height = clampRegion(self.roi, source0.shape)
+            if width <= 0 or height <= 0:
+                self.__clearOutputs()
+                return
+            source0 = source0[y:y + height, x:x + width]
+            offset = (x, y)
+        region = source0.shape[:2]
+
+        # Step HSV_Threshold0:
+        threshold = regionBuffer(self.__threshold_store, region)
+        if self.__lookup is not None:
+            self.__lookup.threshold(source0, threshold)
+        else:
+            self.__hsv_threshold(source0, threshold)
+        self.hsv_threshold_output = threshold
+        if perf is not None:
+            start = perf.lap("hsv threshold", start)
+
+        # Step CV_erode0 / CV_dilate0, ping-ponging between the two morphology buffers.
+        # Zero iterations is a plain copy in OpenCV, so those steps just pass their input on.
+        binary = threshold
+        buffer = 0
+        for operation, iterations in self.__morphology:
+            if iterations > 0:
+                out = regionBuffer(self.__morph_stores[buffer], region)
+                buffer = 1 - buffer
+                if operation == "erode":
+                    cv2.erode(binary, None, dst=out, iterations=iterations,
+                              borderType=cv2.BORDER_CONSTANT, borderValue=-1)
+                else:
+                    cv2.dilate(binary, None, dst=out, iterations=iterations,
+                               borderType=cv2.BORDER_CONSTANT, borderValue=-1)
+                binary = out
+                if perf is not None:
+                    start = perf.lap(operation, start)
+            if operation == "erode":
+                self.cv_erode_output = binary
+            else:
+                self.cv_dilate_output = binary
+
+        # Step Mask0 runs when mask_output is read
+        if self.__mask_enabled:
+            self.__mask_source = source0
+            self.__mask_mask = binary
+
+        # Step Find_Contours0:
+        self.find_contours_output = findContours(binary, self.__external_only, self.__holes, self.__min_hole_area, offset)
+        if perf is not None:
+            start = perf.lap("find contours", start)
+
+        # Step Filter_Contours0:
+        self.filter_contours_output = self.__contour_filter(self.find_contours_output)
+        if perf is not None:
+            perf.lap("filter contours", start)
+
+
+    def __clearOutputs(self):
+        self.hsv_threshold_output = None
+        self.cv_erode_output = None
+        self.cv_dilate_output = None
+        self.__mask_source = None
+        self.__masked = None
+        self.find_contours_output = []
+        self.filter_contours_output = []
+
+    def __hsv_threshold(self, source0, threshold):
+        if self.colour_cache is not None:
+            hsv = self.colour_cache.hsv(source0)
+        else:
+            if self.__hsv_store is None:
+                self.__hsv_store = numpy.empty(self.__threshold_store.size * 3, dtype=numpy.uint8)
+            hsv = cv2.cvtColor(source0, cv2.COLOR_BGR2HSV, dst=regionBuffer(self.__hsv_store, source0.shape))
+        cv2.inRange(hsv, self.__hsv_low, self.__hsv_high, dst=threshold)
+
+    @property
+    def mask_output(self):
+        """The source frame masked by the final binary image, or None if the pipeline has no Mask step."""
+        if self.__mask_source is not None:
+            if self.perf is not None:
+                start = time.monotonic()
+            if self.__masked_store is None:
+                self.__masked_store = numpy.empty(self.__threshold_store.size * 3, dtype=numpy.uint8)
+            self.__masked = regionBuffer(self.__masked_store, self.__mask_source.shape)
+            self.__masked.fill(0)
+            cv2.bitwise_and(self.__mask_source, self.__mask_source, dst=self.__masked, mask=self.__mask_mask)
+            self.__mask_source = None
+            if self.perf is not None:
+                self.perf.lap("mask", start)
+        return self.__masked
+
+
+def findContours(input, external_only, holes=None, min_hole_area=0, offset=(0, 0)):
+    """Finds the contours in a binary image.
+    Args:
+        input: A numpy.ndarray.
+        external_only: A boolean. If true only external contours are found.
+        holes: None, or the [min, max] number of holes an outer contour needs
+            to be kept. Only outer contours are returned when this is set.
+        min_hole_area: Holes with a smaller area are not counted.
+        offset: Added to every contour point, to map a region back to the full frame.
+    Return:
+        A list of numpy.ndarray where each one represents a contour.
+    """
+    if holes is not None:
+        return _outerContoursWithHoles(input, holes, min_hole_area, offset)
+    if(external_only):
+        mode = cv2.RETR_EXTERNAL
+    else:
+        mode = cv2.RETR_LIST
+    method = cv2.CHAIN_APPROX_SIMPLE
+    # OpenCV 3 returns (image, contours, hierarchy), OpenCV 4 (contours, hierarchy)
+    return cv2.findContours(input, mode=mode, method=method, offset=offset)[-2]
+
+
+def _outerContoursWithHoles(input, holes, min_hole_area, offset):
+    # RETR_CCOMP gives a two level hierarchy: outer boundaries and the holes directly inside them
+    contours, hierarchy = cv2.findContours(input, mode=cv2.RETR_CCOMP, method=cv2.CHAIN_APPROX_SIMPLE,
+                                           offset=offset)[-2:]
+    if hierarchy is None:
+        return []
+    parents = hierarchy[0][:,3]
+    outer = parents < 0
+    hole_indices = numpy.flatnonzero(~outer)
+    if min_hole_area > 0:
+        hole_indices = [i for i in hole_indices if cv2.contourArea(contours[i]) >= min_hole_area]
+    hole_counts = numpy.bincount(parents[hole_indices], minlength=len(contours))
+    keep = outer & (hole_counts >= holes[0]) & (hole_counts <= holes[1])
+    return [contours[i] for i in numpy.flatnonzero(keep)]
+
+
+class ContourFilter:
+    """Filter Contours, giving the same result as filterContours on all contours at once.
+
+    Checks whose bounds cannot reject anything at the image size are skipped.
+    The rest run cheapest first and stop once nothing is left: vertex count,
+    bounding box, area, perimeter, then solidity. Convex hulls are only
+    computed when a solidity bound is active.
+    """
+
+    def __init__(self, params, shape):
+        """Works out which checks are active.
+        Args:
+            params: A dict with the keys of FILTER_CONTOURS_DEFAULTS.
+            shape: The shape of the images the contours come from.
+        """
+        height, width = shape[:2]
+        self.params = params
+        # boundingRect is at least 1x1, and a traced contour has fewer than 4 points per pixel
+        self.__vertices = params["min_vertices"] > 1 or params["max_vertices"] < 4*width*height
+        self.__box = (params["min_width"] > 1 or params["max_width"] < width or
+                      params["min_height"] > 1 or params["max_height"] < height or
+                      params["min_ratio"] > 1.0/height or params["max_ratio"] < width)
+        self.__area = params["min_area"] > 0
+        self.__perimeter = params["min_perimeter"] > 0
+        self.__solidity = params["solidity"][0] > 0 or params["solidity"][1] < 100
+
+    def __call__(self, input_contours):
+        """Filters out contours that do not meet the criteria.
+        Args:
+            input_contours: Contours as a list of numpy.ndarray.
+        Returns:
+            Contours as a list of numpy.ndarray.
+        """
+        params = self.params
+        if len(input_contours) == 0:
+            return []
+        if not (self.__vertices or self.__box or self.__area or self.__perimeter or self.__solidity):
+            return list(input_contours)
+
+        points, starts, lengths = concatenateContours(input_contours)
+        keep = numpy.ones(len(input_contours), dtype=bool)
+
+        if self.__vertices:
+            keep &= (lengths >= params["min_vertices"]) & (lengths <= params["max_vertices"])
+
+        if self.__box and keep.any():
+            x_min, x_max, y_min, y_max = contourExtents(input_contours, (points, starts, lengths))
+            w = x_max - x_min + 1
+            h = y_max - y_min + 1
+            ratio = w / h
+            keep &= (w >= params["min_width"]) & (w <= params["max_width"])
+            keep &= (h >= params["min_height"]) & (h <= params["max_height"])
+            keep &= (ratio >= params["min_ratio"]) & (ratio <= params["max_ratio"])
+
+        if (self.__area or self.__perimeter or self.__solidity) and keep.any():
+            following = nextPoints(starts, lengths)
+            areas = contourAreas(points, starts, following)
+            if self.__area:
+                keep &= areas >= params["min_area"]
+            if self.__perimeter and keep.any():
+                keep &= contourPerimeters(points, starts, following) >= params["min_perimeter"]
+
+        if self.__solidity:
+            low, high = params["solidity"]
+            for i in numpy.flatnonzero(keep):
+                hull_area = cv2.contourArea(cv2.convexHull(input_contours[i]))
+                # a hull with no area has no meaningful solidity
+                if hull_area == 0 or not (low <= 100 * areas[i] / hull_area <= high):
+                    keep[i] = False
+
+        return [input_contours[i] for i in numpy.flatnonzero(keep)]
+
+
+def filterContours(input_contours, params):
+    """Filters out contours that do not meet certain criteria.
+
+    This is GRIP's generated per-contour version, kept as the reference for ContourFilter.
+    Args:
+        input_contours: Contours as a list of numpy.ndarray.
+        params: A dict with the keys of FILTER_CONTOURS_DEFAULTS.
+    Returns:
+        Contours as a list of numpy.ndarray.
+    """
+    min_area = params["min_area"]
+    min_perimeter = params["min_perimeter"]
+    min_width = params["min_width"]
+    max_width = params["max_width"]
+    min_height = params["min_height"]
+    max_height = params["max_height"]
+    solidity = params["solidity"]
+    max_vertex_count = params["max_vertices"]
+    min_vertex_count = params["min_vertices"]
+    min_ratio = params["min_ratio"]
+    max_ratio = params["max_ratio"]
+
+    output = []
+    for contour in input_contours:
+        x,y,w,h = cv2.boundingRect(contour)
+        if (w < min_width or w > max_width):
+            continue
+        if (h < min_height or h > max_height):
+            continue
+        area = cv2.contourArea(contour)
+        if (area < min_area):
+            continue
+        if (cv2.arcLength(contour, True) < min_perimeter):
+            continue
+        hull = cv2.convexHull(contour)
+        solid = 100 * area / cv2.contourArea(hull)
+        if (solid < solidity[0] or solid > solidity[1]):
+            continue
+        if (len(contour) < min_vertex_count or len(contour) > max_vertex_count):
+            continue
+        ratio = (float)(w) / h
+        if (ratio < min_ratio or ratio > max_ratio):
+            continue
+        output.append(contour)
+    return output
@@ -0,0 +1,131 @@
+import time
+import cv2
+import numpy
+
+
+class HsvLookupThreshold:
+    """Thresholds BGR frames with a precomputed BGR -> mask lookup table.
+
+    Each channel is quantized to bits bits, and the table holds the
+    cvtColor + inRange result for the centre of every quantized BGR bin.
+    One frame then costs a per-channel LUT, a channel sum and a table
+    lookup. The table is only rebuilt when the HSV bounds change.
+    The index is a uint16, so bits must be from 1 to 5.
+    """
+
+    def __init__(self, bits=5):
+        # 3 * bits index bits have to fit in the uint16 channel sum
+        if not isinstance(bits, int) or not 1 <= bits <= 5:
+            raise ValueError("bits must be an integer from 1 to 5, not {!r}".format(bits))
+        self.bits = bits
+        shift = 8 - bits
+        levels = numpy.arange(256, dtype=numpy.uint16) >> shift
+        # per-channel tables that quantize and shift each channel into its slot of the index
+        self.__channel_lut = numpy.dstack((levels << (2 * bits), levels << bits, levels)).reshape(1, 256, 3)
+        self.__sum = numpy.ones((1, 3), dtype=numpy.float32)
+
+        centres = (numpy.arange(1 << bits, dtype=numpy.uint16) << shift) + (1 << shift) // 2
+        b, g, r = numpy.meshgrid(centres, centres, centres, indexing="ij")
+        self.__bins = numpy.dstack((b.ravel(), g.ravel(), r.ravel())).astype(numpy.uint8)
+        self.__bins_hsv = cv2.cvtColor(self.__bins, cv2.COLOR_BGR2HSV)
+
+        self.__bounds = None
+        self.__table = None
+        self.__quantized = numpy.empty(0, dtype=numpy.uint16)
+        self.__index = numpy.empty(0, dtype=numpy.uint16)
+
+    def setBounds(self, low, high):
+        """Sets the HSV bounds, rebuilding the table only if they changed.
+        Args:
+            low: The (hue, saturation, value) minimums.
+            high: The (hue, saturation, value) maximums.
+        """
+        bounds = (tuple(low), tuple(high))
+        if bounds != self.__bounds:
+            self.__table = cv2.inRange(self.__bins_hsv, bounds[0], bounds[1]).ravel()
+            self.__bounds = bounds
+
+    def threshold(self, source, dst=None):
+        """Segments a BGR image with the lookup table.
+        Args:
+            source: A BGR numpy.ndarray.
+            dst: An optional single channel numpy.ndarray for the result.
+        Returns:
+            A black and white numpy.ndarray.
+        """
+        height, width = source.shape[:2]
+        # the scratch buffers only grow, so a changing region of interest doesn't reallocate them
+        if self.__index.size < height * width:
+            self.__quantized = numpy.empty(height * width * 3, dtype=numpy.uint16)
+            self.__index = numpy.empty(height * width, dtype=numpy.uint16)
+        quantized = self.__quantized[:height * width * 3].reshape(height, width, 3)
+        index = self.__index[:height * width].reshape(height, width)
+        if dst is None:
+            dst = numpy.empty((height, width), dtype=numpy.uint8)
+        cv2.LUT(source, self.__channel_lut, dst=quantized)
+        # the channel slots don't overlap, so summing them is the same as or-ing them
+        cv2.transform(quantized, self.__sum, dst=index)
+        numpy.take(self.__table, index, out=dst)
+        return dst
+
+
+def benchmarkFrames(width, height, count=20):
+    """Makes blurred noise frames with solid blobs, a rough stand-in for field images."""
+    random = numpy.random.default_rng(4638)
+    frames = []
+    for _ in range(count):
+        frame = cv2.GaussianBlur(random.integers(0, 256, (height, width, 3), dtype=numpy.uint8), (0, 0), 5)
+        for _ in range(10):
+            colour = tuple(int(c) for c in random.integers(0, 256, 3))
+            centre = (int(random.integers(0, width)), int(random.integers(0, height)))
+            cv2.circle(frame, centre, int(random.integers(5, height // 5)), colour, -1)
+        frames.append(frame)
+    return frames
+
+
+if __name__ == "__main__":
+    from rb_grip_contours import RED_BALL_PARAMS
+    from bb_grip_contours import BLUE_BALL_PARAMS
+    from ReflectiveTapeContours import REFLECTIVE_TAPE_PARAMS
+
+    repeats = 50
+    for name, params in (("red ball", RED_BALL_PARAMS), ("blue ball", BLUE_BALL_PARAMS),
+                         ("reflective tape", REFLECTIVE_TAPE_PARAMS)):
+        hsv = params["hsv_threshold"]
+        low = (hsv["hue"][0], hsv["saturation"][0], hsv["value"][0])
+        high = (hsv["hue"][1], hsv["saturation"][1], hsv["value"][1])
+
+        start = time.perf_counter()
+        lut = HsvLookupThreshold()
+        lut.setBounds(low, high)
+        build = time.perf_counter() - start
+
+        for width, height in ((320, 240), (640, 480)):
+            frames = benchmarkFrames(width, height)
+            hsv_image = numpy.empty((height, width, 3), dtype=numpy.uint8)
+            expected = numpy.empty((height, width), dtype=numpy.uint8)
+            actual = numpy.empty((height, width), dtype=numpy.uint8)
+
+            start = time.perf_counter()
+            for _ in range(repeats):
+                for frame in frames:
+                    cv2.cvtColor(frame, cv2.COLOR_BGR2HSV, dst=hsv_image)
+                    cv2.inRange(hsv_image, low, high, dst=expected)
+            convert = (time.perf_counter() - start) / (repeats * len(frames))
+
+            start = time.perf_counter()
+            for _ in range(repeats):
+                for frame in frames:
+                    lut.threshold(frame, actual)
+            lookup = (time.perf_counter() - start) / (repeats * len(frames))
+
+            mismatched = 0
+            for frame in frames:
+                cv2.inRange(cv2.cvtColor(frame, cv2.COLOR_BGR2HSV), low, high, dst=expected)
+                lut.threshold(frame, actual)
+                mismatched += numpy.count_nonzero(expected != actual)
+
+            print("{} {}x{}: cvtColor+inRange {:.3f}ms, lookup {:.3f}ms ({:.2f}x), "
+                  "mismatched {:.3f}% of pixels, table built in {:.1f}ms".format(
+                      name, width, height, 1000 * convert, 1000 * lookup, convert / lookup,
+                      100 * mismatched / (len(frames) * width * height), 1000 * build))
@@ -0,0 +1,143 @@
+import os
+import threading
+import time
+import numpy
+from vision_publisher import SNAPSHOT_FIELDS
+
+
+# the robot inputs kept with each recorded frame, in the order of the "inputs" array
+INPUT_FIELDS = ("isRedAlliance", "isReversed", "Motor Velocity")
+
+
+class MatchRecorder(threading.Thread):
+    """Keeps the last few seconds of what the vision loop saw and writes them out when triggered.
+
+    Every frame, record() copies both camera frames, their timestamps, the
+    robot inputs and the published snapshot into a ring buffer that is
+    allocated up front, so recording allocates nothing. trigger() hands the
+    buffer to this thread, which writes it to an .npz file in directory.
+    Recording pauses while the file is written, so the loop never waits on
+    the disk and the buffer needs no second copy. replay.py reads the files.
+    """
+
+    def __init__(self, directory, width, height, seconds=5, fps=30, compress=False):
+        threading.Thread.__init__(self, name="match recorder", daemon=True)
+        self.directory = directory
+        self.compress = compress
+        self.size = max(1, int(seconds * fps))
+        # filled now so the memory is committed before the match, not on the first pass through the ring
+        self.__image_A = numpy.empty((self.size, height, width, 3), dtype=numpy.uint8)
+        self.__image_B = numpy.empty((self.size, height, width, 3), dtype=numpy.uint8)
+        self.__image_A.fill(0)
+        self.__image_B.fill(0)
+        self.__timestamps = numpy.zeros((self.size, 2), dtype=numpy.int64)
+        self.__inputs = numpy.zeros((self.size, len(INPUT_FIELDS)), dtype=numpy.float64)
+        self.__outputs = numpy.zeros((self.size, len(SNAPSHOT_FIELDS)), dtype=numpy.float64)
+        self.__next = 0
+        self.__count = 0
+        self.__saving = False
+        self.__reason = None
+        self.__lock = threading.Condition()
+        self.__running = True
+
+    @property
+    def saving(self):
+        return self.__saving
+
+    def record(self, image_A, image_B, timestamp_A, timestamp_B, inputs, outputs):
+        """Adds a frame to the ring buffer, replacing the oldest once it is full.
+        Args:
+            image_A: The ball camera's frame.
+            image_B: The reflective tape camera's frame.
+            timestamp_A: image_A's capture timestamp.
+            timestamp_B: image_B's capture timestamp.
+            inputs: The robot inputs, in the order of INPUT_FIELDS.
+            outputs: The published values, in the order of SNAPSHOT_FIELDS.
+        """
+        if self.__saving:
+            return
+        slot = self.__next
+        numpy.copyto(self.__image_A[slot], image_A)
+        numpy.copyto(self.__image_B[slot], image_B)
+        self.__timestamps[slot, 0] = timestamp_A
+        self.__timestamps[slot, 1] = timestamp_B
+        self.__inputs[slot] = inputs
+        self.__outputs[slot] = outputs
+        self.__next = (slot + 1) % self.size
+        self.__count = min(self.__count + 1, self.size)
+
+    def trigger(self, reason):
+        """Writes out the recorded frames, unless they are already being written.
+        Args:
+            reason: Added to the file name, e.g. "match end".
+        Returns:
+            True if the frames will be written.
+        """
+        with self.__lock:
+            if self.__saving or self.__count == 0:
+                return False
+            self.__saving = True
+            self.__reason = reason
+            self.__lock.notify()
+        return True
+
+    def run(self):
+        while self.__running:
+            with self.__lock:
+                if not self.__lock.wait_for(lambda: self.__reason is not None, 0.5):
+                    continue
+                reason = self.__reason
+            try:
+                path = self.__write(reason)
+                print("recorded {} frames to '{}'".format(self.__count, path))
+            except OSError as err:
+                print("could not write recording: {}".format(err))
+            with self.__lock:
+                self.__reason = None
+                self.__next = 0
+                self.__count = 0
+                self.__saving = False
+
+    def __write(self, reason):
+        os.makedirs(self.directory, exist_ok=True)
+        name = "{}-{}.npz".format(time.strftime("%Y%m%d-%H%M%S"), reason.replace(" ", "-"))
+        path = os.path.join(self.directory, name)
+        # a full ring is written as it is, with the slot of the oldest frame in start
+        count = self.__count
+        start = self.__next if count == self.size else 0
+        save = numpy.savez_compressed if self.compress else numpy.savez
+        # written under a temporary name so a partly written file is never read
+        with open(path + ".part", "wb") as f:
+            save(f,
+                 start=start,
+                 image_A=self.__image_A[:count],
+                 image_B=self.__image_B[:count],
+                 timestamps=self.__timestamps[:count],
+                 inputs=self.__inputs[:count],
+                 input_fields=numpy.array(INPUT_FIELDS),
+                 outputs=self.__outputs[:count],
+                 output_fields=numpy.array(SNAPSHOT_FIELDS))
+        os.replace(path + ".part", path)
+        return path
+
+    def stop(self):
+        self.__running = False
+
+
+def readRecording(path):
+    """Reads a file written by MatchRecorder.
+    Args:
+        path: The .npz file.
+    Returns:
+        A dict of the recorded arrays, oldest frame first: "image_A", "image_B",
+        "timestamps", "inputs" and "outputs", with the field names of the
+        last two in "input_fields" and "output_fields".
+    """
+    recording = {}
+    with numpy.load(path) as f:
+        start = int(f["start"])
+        for key in ("image_A", "image_B", "timestamps", "inputs", "outputs"):
+            recording[key] = numpy.roll(f[key], -start, axis=0)
+        recording["input_fields"] = [str(field) for field in f["input_fields"]]
+        recording["output_fields"] = [str(field) for field in f["output_fields"]]
+    return recording
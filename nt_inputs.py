@@ -0,0 +1,69 @@
+import threading
+
+from networktables import NetworkTablesInstance
+
+
+class InputCache:
+    """Mirrors NetworkTables inputs into plain attributes.
+
+    Each input is kept up to date by an entry listener, the way
+    startSwitchedCamera follows its selection key, so the vision loop
+    reads an attribute instead of polling the table every frame.
+    changed() reports whether an input has changed since it was last
+    asked, so work like switching pipelines only happens on a change.
+    The listeners don't see local writes, so inputs the vision loop
+    resets itself are written with putBoolean().
+    """
+
+    def __init__(self, table):
+        self.table = table
+        self.__lock = threading.Lock()
+        self.__changed = set()
+        self.__keys = {}
+
+    def addBoolean(self, name, key, default):
+        """Mirrors a boolean entry into the attribute name."""
+        self.__add(name, key, default, lambda value: isinstance(value, bool))
+
+    def addNumber(self, name, key, default):
+        """Mirrors a number entry into the attribute name."""
+        self.__add(name, key, default,
+                   lambda value: isinstance(value, (int, float)) and not isinstance(value, bool))
+
+    def __add(self, name, key, default, accepts):
+        setattr(self, name, default)
+        self.__keys[name] = key
+        # new inputs count as changed so the first loop configures itself from them
+        self.__changed.add(name)
+
+        def listener(fromobj, key, value, isNew):
+            if accepts(value) and value != getattr(self, name):
+                with self.__lock:
+                    setattr(self, name, value)
+                    self.__changed.add(name)
+
+        self.table.getEntry(key).addListener(
+            listener,
+            NetworkTablesInstance.NotifyFlags.IMMEDIATE |
+            NetworkTablesInstance.NotifyFlags.NEW |
+            NetworkTablesInstance.NotifyFlags.UPDATE)
+
+    def putBoolean(self, name, value):
+        """Writes a boolean input back to its entry, without counting it as a change.
+        Args:
+            name: The attribute the input is mirrored into.
+            value: The new value.
+        """
+        # the cache is set first, so a robot write straight after this one still counts as a change
+        with self.__lock:
+            setattr(self, name, value)
+            self.__changed.discard(name)
+        self.table.putBoolean(self.__keys[name], value)
+
+    def changed(self, name):
+        """True if the input has changed since the last call for it."""
+        with self.__lock:
+            if name in self.__changed:
+                self.__changed.discard(name)
+                return True
+            return False
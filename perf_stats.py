@@ -0,0 +1,102 @@
+import time
+import numpy
+
+
+# the percentiles published for each span, in the order of its number array
+PERCENTILES = (50, 95, 99)
+
+
+class PerfStats:
+    """Rolling timings of named spans of the vision loop.
+
+    Code that is timed keeps an optional PerfStats, None when timing is off,
+    and only reads the clock when it has one:
+
+        if perf is not None:
+            start = time.monotonic()
+        ...
+        if perf is not None:
+            start = perf.lap("find contours", start)
+
+    The last window durations of each span are kept in a preallocated ring.
+    tick() publishes their PERCENTILES in milliseconds to the table every
+    publish_interval seconds, one number array per span. A span is only
+    recorded by one thread at a time, so spans need no lock.
+    """
+
+    def __init__(self, table=None, window=300, publish_interval=1.0):
+        self.table = table
+        self.window = window
+        self.__publish_interval = publish_interval
+        self.__last_publish = time.monotonic()
+        self.__spans = {}
+        if table is not None:
+            table.putStringArray('Percentiles', ["p{}".format(p) for p in PERCENTILES])
+
+    def lap(self, name, start):
+        """Records the time since start as a span.
+        Args:
+            name: The span's name.
+            start: The time.monotonic() the span started.
+        Returns:
+            The time.monotonic() now, to start the next span.
+        """
+        now = time.monotonic()
+        self.record(name, now - start)
+        return now
+
+    def record(self, name, elapsed):
+        """Records a span's duration in seconds."""
+        span = self.__spans.get(name)
+        if span is None:
+            span = self.__spans[name] = [numpy.zeros(self.window), 0]
+        span[0][span[1] % self.window] = elapsed
+        span[1] += 1
+
+    def scope(self, prefix):
+        """A view of these stats that puts prefix in front of span names, for one of several pipelines."""
+        return PerfScope(self, prefix)
+
+    def percentiles(self):
+        """Returns a dict of each span's PERCENTILES over the window, in milliseconds."""
+        result = {}
+        for name, (samples, count) in list(self.__spans.items()):
+            if count > 0:
+                result[name] = [1000 * float(value) for value in
+                                numpy.percentile(samples[:min(count, self.window)], PERCENTILES)]
+        return result
+
+    def tick(self):
+        """Call once per frame to publish every publish_interval seconds."""
+        now = time.monotonic()
+        if now - self.__last_publish >= self.__publish_interval:
+            self.__last_publish = now
+            if self.table is not None:
+                for name, values in self.percentiles().items():
+                    self.table.putNumberArray(name, values)
+
+    def report(self):
+        """Prints the percentiles of every span."""
+        for name, values in sorted(self.percentiles().items()):
+            print("  {}: {}".format(name, ", ".join(
+                "p{} {:.2f}ms".format(p, value) for p, value in zip(PERCENTILES, values))))
+
+
+class PerfScope:
+    """Records into a PerfStats with a prefix on every span name."""
+
+    def __init__(self, stats, prefix):
+        self.stats = stats
+        self.prefix = prefix
+        self.__names = {}
+
+    def lap(self, name, start):
+        now = time.monotonic()
+        self.record(name, now - start)
+        return now
+
+    def record(self, name, elapsed):
+        full_name = self.__names.get(name)
+        if full_name is None:
+            full_name = self.__names[name] = self.prefix + " " + name
+        self.stats.record(full_name, elapsed)
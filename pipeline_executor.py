@@ -0,0 +1,69 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class PipelineExecutor:
+    """Runs one frame's GRIP pipelines, either serially or on a worker pool.
+
+    OpenCV releases the GIL inside cvtColor, inRange, erode and findContours,
+    so pipelines for different cameras overlap on separate cores when run on
+    the pool. Wall time for each pipeline and for the whole batch is
+    accumulated and printed every report_interval seconds. The times of the
+    last batch alone are kept in last.
+    """
+
+    def __init__(self, parallel, workers=2, report_interval=5.0):
+        self.parallel = parallel
+        self.__pool = ThreadPoolExecutor(max_workers=workers) if parallel else None
+        self.__report_interval = report_interval
+        self.__last_report = time.monotonic()
+        self.timings = {}
+        self.last = {}
+
+    def run(self, jobs):
+        """Processes each (name, pipeline, image) job and waits for all of them.
+        Args:
+            jobs: A list of (name, pipeline, image) tuples.
+        """
+        start = time.monotonic()
+        self.last = {}
+        if self.__pool is None:
+            for name, pipeline, image in jobs:
+                self.__process(name, pipeline, image)
+        else:
+            futures = [self.__pool.submit(self.__process, name, pipeline, image)
+                       for name, pipeline, image in jobs]
+            for future in futures:
+                future.result()
+        self.__record("total", time.monotonic() - start)
+
+        if start - self.__last_report >= self.__report_interval:
+            self.report()
+            self.__last_report = start
+
+    def __process(self, name, pipeline, image):
+        start = time.monotonic()
+        pipeline.process(image)
+        self.__record(name, time.monotonic() - start)
+
+    def __record(self, name, elapsed):
+        # each name is only ever recorded by one thread at a time
+        timing = self.timings.setdefault(name, [0.0, 0])
+        timing[0] += elapsed
+        timing[1] += 1
+        self.last[name] = elapsed
+
+    def report(self):
+        """Prints the mean time per stage since the last report and resets it."""
+        mode = "parallel" if self.parallel else "serial"
+        stages = []
+        for name, timing in self.timings.items():
+            if timing[1] > 0:
+                stages.append("{} {:.1f}ms".format(name, 1000 * timing[0] / timing[1]))
+            timing[0] = 0.0
+            timing[1] = 0
+        print("pipelines ({}): {}".format(mode, ", ".join(stages)))
+
+    def shutdown(self):
+        if self.__pool is not None:
+            self.__pool.shutdown()
@@ -0,0 +1,51 @@
+import time
+
+
+class PipelineScheduler:
+    """Decides which pipelines run on each frame.
+
+    A pipeline with an interval of n runs on every nth frame, and not at all
+    for an interval of 0. The interval is passed on every frame so it can
+    follow the robot's state. The rate each pipeline actually ran at is
+    kept in rates and printed every report_interval seconds.
+    """
+
+    def __init__(self, report_interval=5.0):
+        self.__report_interval = report_interval
+        self.__last_report = time.monotonic()
+        self.__last_run = {}
+        self.__runs = {}
+        self.rates = {}
+
+    def due(self, name, interval, frame):
+        """Returns True if the pipeline should run on this frame, and counts the run.
+        Args:
+            name: The pipeline's name.
+            interval: Frames between runs, or 0 to not run.
+            frame: The number of the current frame.
+        """
+        self.__runs.setdefault(name, 0)
+        if interval <= 0:
+            return False
+        last = self.__last_run.get(name)
+        if last is not None and frame - last < interval:
+            return False
+        self.__last_run[name] = frame
+        self.__runs[name] += 1
+        return True
+
+    def tick(self):
+        """Call once per frame to update the rates."""
+        now = time.monotonic()
+        elapsed = now - self.__last_report
+        if elapsed >= self.__report_interval:
+            for name in self.__runs:
+                self.rates[name] = self.__runs[name] / elapsed
+                self.__runs[name] = 0
+            self.__last_report = now
+            self.report()
+
+    def report(self):
+        """Prints the runs per second of each pipeline over the last report interval."""
+        print("pipeline rates: {}".format(", ".join(
+            "{} {:.1f}/s".format(name, rate) for name, rate in self.rates.items())))
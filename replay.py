@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+
+# Runs the vision loop headless on recorded frames instead of the robot's
+# cameras, as fast as it will go. Prints the values published for every
+# frame with the time each stage took, then the overall fps. The step time
+# is the whole loop, including reading the recorded frames.
+#
+#   python3 replay.py <ball frames> [<reflective tape frames>] [--config frc.json]
+#                     [--set isRedAlliance=false] [--summary] [--perf]
+#
+# Frames can be a video file, a directory of images, a single image or an
+# .npz recording from MatchRecorder. A recording's ball frames are
+# replayed with its tape frames and the robot inputs recorded with them.
+
+import argparse
+import json
+import os
+import sys
+import time
+import cv2
+import numpy
+from match_recorder import readRecording, INPUT_FIELDS
+from vision_loop import (VisionLoop, readVisionSettings, configCameraNames, cameraRegions,
+                         VIDEO_WIDTH, VIDEO_HEIGHT)
+
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp")
+
+
+def readFrames(path, camera="A"):
+    """Yields the BGR frames of a video file, a directory of images, a single image or a recording.
+    Args:
+        path: The frames.
+        camera: The recorded camera, "A" or "B", if path is a recording.
+    """
+    if path.lower().endswith(".npz"):
+        for frame in readRecording(path)["image_" + camera]:
+            yield frame
+    elif os.path.isdir(path):
+        names = sorted(name for name in os.listdir(path) if name.lower().endswith(IMAGE_EXTENSIONS))
+        for name in names:
+            frame = cv2.imread(os.path.join(path, name), cv2.IMREAD_COLOR)
+            if frame is not None:
+                yield frame
+    elif path.lower().endswith(IMAGE_EXTENSIONS):
+        frame = cv2.imread(path, cv2.IMREAD_COLOR)
+        if frame is None:
+            raise OSError("could not read '{}'".format(path))
+        yield frame
+    else:
+        video = cv2.VideoCapture(path)
+        if not video.isOpened():
+            raise OSError("could not open '{}'".format(path))
+        try:
+            while True:
+                ok, frame = video.read()
+                if not ok:
+                    break
+                yield frame
+        finally:
+            video.release()
+
+
+class ReplaySource:
+    """Serves recorded frames through the CaptureThread interface.
+
+    Every getLatest() moves on to the next frame, so the loop never waits.
+    Frames are scaled to the capture size. Timestamps are spaced as if the
+    frames were captured at fps, and each frame counts as captured when
+    it is served, so latencies are pure processing time. After the last
+    frame, finished is set and the last frame is served again. path can
+    also be a list of frames that have already been read.
+    """
+
+    def __init__(self, path, width, height, fps=30, camera="A"):
+        self.path = path
+        self.__frames = readFrames(path, camera) if isinstance(path, str) else iter(path)
+        self.__size = (width, height)
+        self.__period = 1e6 / fps
+        self.__frame = numpy.zeros((height, width, 3), dtype=numpy.uint8)
+        self.__served = None
+        self.timestamp = 0
+        self.frameCount = 0
+        self.error = None
+        self.finished = False
+
+    def waitForFrame(self, frameCount, timeout):
+        return not self.finished
+
+    def getLatest(self, image):
+        frame = next(self.__frames, None)
+        if frame is None:
+            self.finished = True
+        else:
+            if frame.shape[1::-1] != self.__size:
+                frame = cv2.resize(frame, self.__size, interpolation=cv2.INTER_AREA)
+            self.__frame = frame
+            self.frameCount += 1
+            self.timestamp = int(self.frameCount * self.__period)
+        if image is None or image.shape != self.__frame.shape:
+            image = numpy.empty_like(self.__frame)
+        numpy.copyto(image, self.__frame)
+        self.__served = time.monotonic()
+        return self.timestamp, self.frameCount, image
+
+    def captureTime(self, timestamp):
+        if timestamp == 0 or timestamp != self.timestamp:
+            return None
+        return self.__served
+
+
+class ReplayEntry:
+    def __init__(self, table, key):
+        self.__table = table
+        self.__key = key
+
+    def addListener(self, listener, flags):
+        self.__table.addListener(self.__key, listener)
+
+
+class ReplayTable:
+    """A stand-in for an NT table that keeps what the vision loop publishes.
+
+    Robot inputs are set with setInput(), which notifies listeners like an
+    update from the robot would.
+    """
+
+    def __init__(self):
+        self.values = {}
+        self.published = {}
+        self.__listeners = {}
+
+    def getEntry(self, key):
+        return ReplayEntry(self, key)
+
+    def addListener(self, key, listener):
+        self.__listeners.setdefault(key, []).append(listener)
+        if key in self.values:
+            listener(self, key, self.values[key], False)
+
+    def setInput(self, key, value):
+        isNew = key not in self.values
+        self.values[key] = value
+        for listener in self.__listeners.get(key, []):
+            listener(self, key, value, isNew)
+
+    def putNumber(self, key, value):
+        self.values[key] = value
+        self.published[key] = value
+
+    def putBoolean(self, key, value):
+        self.values[key] = value
+
+    def putNumberArray(self, key, value):
+        self.values[key] = list(value)
+        self.published[key] = list(value)
+
+    def putStringArray(self, key, value):
+        self.values[key] = list(value)
+
+    def getNumber(self, key, defaultValue):
+        return self.values.get(key, defaultValue)
+
+    def getBoolean(self, key, defaultValue):
+        return self.values.get(key, defaultValue)
+
+
+class ReplayNetworkTables:
+    """A stand-in for the NT instance. flush() keeps one frame's published values."""
+
+    def __init__(self, table):
+        self.table = table
+        self.frames = []
+
+    def getTable(self, name):
+        return self.table
+
+    def flush(self):
+        self.frames.append(self.table.published)
+        self.table.published = {}
+
+
+def parseInput(text):
+    """Parses a key=value robot input, where value is true, false or a number."""
+    key, _, value = text.partition("=")
+    if value.lower() in ("true", "false"):
+        return key, value.lower() == "true"
+    return key, float(value)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Runs the vision loop on recorded frames.")
+    parser.add_argument("ball", help="ball camera frames: a video, a directory of images, an image or a recording")
+    parser.add_argument("reflective", nargs="?", help="reflective tape camera frames, the ball frames if not given")
+    parser.add_argument("--config", help="a frc.json whose \"vision\" settings and roi are used")
+    parser.add_argument("--camera-names", nargs=2,
+                        help="the ball and reflective tape cameras' names in the config's roi, "
+                             "the first two of its \"cameras\" if not given")
+    parser.add_argument("--fps", type=float, default=30, help="frame rate the recordings were captured at")
+    parser.add_argument("--set", action="append", default=[], metavar="KEY=VALUE",
+                        help="a robot input, e.g. isRedAlliance=false")
+    parser.add_argument("--summary", action="store_true", help="only print the totals")
+    parser.add_argument("--perf", action="store_true", help="time every step and print their percentiles")
+    args = parser.parse_args()
+
+    config = {}
+    if args.config is not None:
+        with open(args.config, "rt", encoding="utf-8") as f:
+            config = json.load(f)
+    try:
+        settings = readVisionSettings(config.get("vision", {}))
+        ballRoi, reflectiveRoi = cameraRegions(settings, args.camera_names or configCameraNames(config))
+    except ValueError as err:
+        print("config error in '{}': {}".format(args.config, err), file=sys.stderr)
+        sys.exit(1)
+
+    settings.perf = settings.perf or args.perf
+
+    table = ReplayTable()
+    for text in args.set:
+        table.setInput(*parseInput(text))
+    ntinst = ReplayNetworkTables(table)
+
+    captureA = ReplaySource(args.ball, VIDEO_WIDTH, VIDEO_HEIGHT, args.fps)
+    captureB = ReplaySource(args.reflective or args.ball, VIDEO_WIDTH, VIDEO_HEIGHT, args.fps, camera="B")
+    loop = VisionLoop(settings, captureA, captureB, table, ntinst,
+                      ballRoi=ballRoi, reflectiveRoi=reflectiveRoi)
+
+    #a recording's inputs are set before each of its frames, replacing any given with --set
+    recordedInputs = readRecording(args.ball)["inputs"] if args.ball.lower().endswith(".npz") else None
+
+    stages = {}
+    start = time.monotonic()
+    while True:
+        if recordedInputs is not None and captureA.frameCount < len(recordedInputs):
+            for key, value in zip(INPUT_FIELDS, recordedInputs[captureA.frameCount]):
+                table.setInput(key, float(value) if key == "Motor Velocity" else bool(value))
+        step_start = time.monotonic()
+        loop.step()
+        step = time.monotonic() - step_start
+        if captureA.finished or captureB.finished:
+            # the step after the last frame repeated it, so it isn't counted
+            break
+        times = dict(loop.executor.last, step=step)
+        for name, elapsed in times.items():
+            stages.setdefault(name, []).append(elapsed)
+        if not args.summary:
+            published = ntinst.frames[-1]
+            print("frame {}: {} | {}".format(
+                captureA.frameCount,
+                ", ".join("{} {:.2f}ms".format(name, 1000 * elapsed) for name, elapsed in times.items()),
+                ", ".join("{}={:.4g}".format(key, value) for key, value in sorted(published.items())
+                          if not isinstance(value, list))))
+    elapsed = time.monotonic() - start
+
+    frames = len(stages.get("step", []))
+    print("{} frames in {:.2f}s, {:.1f} fps".format(frames, elapsed, frames / elapsed if elapsed > 0 else 0))
+    for name, times in stages.items():
+        times = numpy.array(times) * 1000
+        print("  {}: mean {:.2f}ms, p95 {:.2f}ms, max {:.2f}ms ({} runs)".format(
+            name, times.mean(), numpy.percentile(times, 95), times.max(), len(times)))
+    if loop.perf is not None:
+        print("steps:")
+        loop.perf.report()
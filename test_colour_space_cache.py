@@ -0,0 +1,32 @@
+import numpy
+from grip_pipeline import ColourSpaceCache
+
+
+def convert(cache, frame, regions):
+    """Converts each (x, y, width, height) region of frame through the cache, in order."""
+    return [cache.hsv(frame[y:y + height, x:x + width]) for x, y, width, height in regions]
+
+
+def test_alternating_sizes_reuse_buffers():
+    random = numpy.random.default_rng(4638)
+    frame = random.integers(0, 256, (240, 320, 3), dtype=numpy.uint8)
+    whole = (0, 0, 320, 240)
+    region = (40, 30, 200, 120)
+    cache = ColourSpaceCache()
+    # the buffers come back in a different order to the one they are asked for in
+    for regions in ([whole, region], [region, whole], [whole, region], [region, whole], [region], [whole]):
+        cache.newFrame()
+        convert(cache, frame, regions)
+
+    cache.newFrame()
+    first, second = convert(cache, frame, [region, whole])
+    x, y, width, height = region
+    expected = ColourSpaceCache().hsv(frame[y:y + height, x:x + width])
+    assert numpy.array_equal(first, expected)
+    assert numpy.array_equal(second, ColourSpaceCache().hsv(frame))
+
+
+def test_same_source_converted_once():
+    frame = numpy.zeros((240, 320, 3), dtype=numpy.uint8)
+    cache = ColourSpaceCache()
+    assert cache.hsv(frame) is cache.hsv(frame)
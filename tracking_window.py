@@ -0,0 +1,71 @@
+class TrackingWindow:
+    """Chooses the part of the frame to search for the ball we are locked on to.
+
+    While a ball is tracked only a window around its last centre is searched,
+    a few ball widths across. The window is dropped, and the next search
+    covers the whole frame, when the ball is lost and every
+    reacquire_interval frames so a closer ball can't be missed for long.
+    """
+
+    def __init__(self, scale=3.0, min_size=40, reacquire_interval=15):
+        """
+        Args:
+            scale: The window size, in ball widths.
+            min_size: The smallest window side, in pixels.
+            reacquire_interval: Frames between full frame searches while tracking.
+        """
+        self.scale = scale
+        self.min_size = min_size
+        self.reacquire_interval = reacquire_interval
+        self.reset()
+
+    def reset(self):
+        """Forgets the tracked ball, so the next search covers the whole frame."""
+        self.__centre = None
+        self.__size = 0
+        self.__frames = 0
+        self.__windowed = False
+
+    @property
+    def tracking(self):
+        return self.__centre is not None
+
+    @property
+    def windowed(self):
+        """True if the last region() was a window rather than the whole frame."""
+        return self.__windowed
+
+    def region(self, bounds):
+        """Returns the region to search this frame.
+        Args:
+            bounds: The (x, y, width, height) the search is limited to anyway.
+        Returns:
+            The window around the tracked ball clipped to bounds, or bounds
+            when the whole frame should be searched.
+        """
+        self.__windowed = False
+        if self.__centre is None or self.__frames >= self.reacquire_interval:
+            return bounds
+        side = max(self.scale * self.__size, self.min_size)
+        x_min = max(self.__centre[0] - side/2, bounds[0])
+        y_min = max(self.__centre[1] - side/2, bounds[1])
+        x_max = min(self.__centre[0] + side/2, bounds[0] + bounds[2])
+        y_max = min(self.__centre[1] + side/2, bounds[1] + bounds[3])
+        if x_max <= x_min or y_max <= y_min:
+            return bounds
+        self.__windowed = True
+        return (int(x_min), int(y_min), int(x_max - x_min + 1), int(y_max - y_min + 1))
+
+    def update(self, x_center, y_center, size):
+        """Records the result of searching the last region().
+        Args:
+            x_center: The centre of the chosen ball in pixels, or -1 if there is none.
+            y_center: The centre of the chosen ball in pixels.
+            size: The width of the chosen ball in pixels.
+        """
+        if x_center == -1:
+            self.reset()
+            return
+        self.__frames = self.__frames + 1 if self.__windowed else 0
+        self.__centre = (x_center, y_center)
+        self.__size = size
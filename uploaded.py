@@ -5,20 +5,15 @@
 # the WPILib BSD license file in the root directory of this project.
 
 import json
-import time
 import sys
-import cv2
-import numpy
-from bb_grip_contours import BlueBallGripPipeline
-from rb_grip_contours import RedBallGripPipeline
-from cscore import CameraServer, VideoSource, UsbCamera, MjpegServer, CvSink
+from cscore import CameraServer, VideoSource, VideoMode, UsbCamera, CvSink, CvSource
 from networktables import NetworkTablesInstance
-from ReflectiveTapeContours import ReflectiveTapeContours
+from camera_capture import CaptureThread
+from dashboard_stream import DashboardStream
+from vision_loop import VisionLoop, VisionSettings, readVisionSettings, cameraRegions, VIDEO_WIDTH, VIDEO_HEIGHT, STREAM_FPS, RECORD_SECONDS
+from match_recorder import MatchRecorder
 
 
-VIDEO_WIDTH = 320
-VIDEO_HEIGHT = 240
-
 #   JSON format:
 #   {
 #       "team": <team number>,
@@ -58,6 +53,40 @@ VIDEO_HEIGHT = 240
 #               // if NT value is a double, it's treated as an integer index
 #           }
 #       ]
+#       "vision": {                                      // optional
+#           "parallel pipelines": <true or false>        // optional
+#           "detect opponent balls": <true or false>     // optional
+#           "hsv lookup table": <true or false>          // optional
+#           "tracking window": <true or false>           // optional
+#           "reacquire interval": <frames>               // optional
+#           "ball tracker": <true or false>              // optional
+#           "extrapolate": <true or false>               // optional, needs the ball tracker
+#           "legacy keys": <true or false>               // optional, true if unspecified
+#           "perf": <true or false>                      // optional, publishes step timings to Vision/Perf
+#           "stream": {                                  // optional, the "UI Active Cam" stream
+#               "fps": <most frames per second>          // optional
+#               "width": <stream width>                  // optional
+#               "height": <stream height>                // optional
+#               "quality": <JPEG quality, 0-100>         // optional
+#           }
+#           "record": {                                  // optional, keeps the last frames for replay.py
+#               "directory": <where recordings are written> // optional, /home/pi/recordings if unspecified
+#               "seconds": <length of the recording>     // optional
+#               "fps": <loop frames per second>          // optional
+#               "compress": <true or false>              // optional, false if unspecified
+#           }
+#           "grip files": {                              // optional
+#               "red ball": <path to .grip file>         // optional
+#               "blue ball": <path to .grip file>        // optional
+#               "reflective tape": <path to .grip file>  // optional
+#           }                                            // Find Contours' "External Only" is used as set in
+#                                                        // the file; the bundled .grip files have it on, like
+#                                                        // the built-in pipelines
+#           "roi": {                                     // optional
+#               <camera name>: [x, y, width, height]     // only this region is searched, the name
+#                                                        // must be one of "cameras"
+#           }
+#       }
 #   }
 
 configFile = "/boot/frc.json"
@@ -69,6 +98,7 @@ server = False
 cameraConfigs = []
 switchedCameraConfigs = []
 cameras = []
+visionSettings = VisionSettings()
 
 def parseError(str):
     """Report parse error."""
@@ -125,6 +155,7 @@ def readConfig():
     """Read configuration file."""
     global team
     global server
+    global visionSettings
 
     # parse file
     try:
@@ -172,6 +203,15 @@ def readConfig():
             if not readSwitchedCameraConfig(camera):
                 return False
 
+    # vision settings (optional)
+    if "vision" in j:
+        try:
+            visionSettings = readVisionSettings(j["vision"])
+            cameraRegions(visionSettings, [config.name for config in cameraConfigs])
+        except ValueError as err:
+            parseError("{}".format(err)) #str is the ntmode value in here
+            return False
+
     return True
 
 def startCamera(config):
@@ -225,145 +265,6 @@ def getExtrema(contours):
 
     return max_point, min_point
 
-def runReflective(image, mainContours):
-    found_contours = []
-    num_found_countours = len(mainContours)
-    avg_dist = 0
-    avg_x_center_green = 0
-    avg_y_center_green = 0
-    for contours in mainContours:
-
-        contourPoints = contours[:,0]
-
-        x_points_green = contourPoints[:,0]
-        y_points_green = contourPoints[:,1]
-
-        x_min_green = numpy.amin(x_points_green)
-        x_max_green = numpy.amax(x_points_green)
-        green_width = x_max_green - x_min_green
-        FOCAL_LENGTH = 374.8#289.1 #old 217.42   
-
-
-        #call distance function to return widths
-        Green_Real_Width = 5 #in
-        perceived_distance = (FOCAL_LENGTH*Green_Real_Width)/green_width
-        #print(green_width)
-
-        y_min_green = numpy.amin(y_points_green)
-        y_max_green = numpy.amax(y_points_green)
-
-        x_center_green = ((x_max_green - x_min_green)/2) + x_min_green
-        y_center_green = ((y_max_green - y_min_green)/2) + y_min_green
-
-        
-
-
-        #Draws center of balls
-        #image = cv2.line(image, ((x_center_yellow).astype(numpy.int64),((y_center_yellow) - 15).astype(numpy.int64)),((x_center_yellow).astype(numpy.int64),((y_center_yellow) + 15).astype(numpy.int64)),(0,0,0),3)
-        #image = cv2.line(image, (((x_center_yellow) - 15).astype(numpy.int64),(y_center_yellow).astype(numpy.int64)),(((x_center_yellow) + 15).astype(numpy.int64),(y_center_yellow).astype(numpy.int64)),(0,0,0),3)
-
-        #Draws box around balls
-        cv2.line(image, ((x_max_green).astype(numpy.int64),((y_max_green)).astype(numpy.int64)),((x_max_green).astype(numpy.int64),((y_min_green)).astype(numpy.int64)),(0,0,0),5)
-        cv2.line(image, (((x_min_green)).astype(numpy.int64),(y_max_green).astype(numpy.int64)),(((x_min_green)).astype(numpy.int64),(y_min_green).astype(numpy.int64)),(0,0,0),5)
-        cv2.line(image, ((x_max_green).astype(numpy.int64),((y_max_green)).astype(numpy.int64)),((x_min_green).astype(numpy.int64),((y_max_green)).astype(numpy.int64)),(0,0,0),5)
-        cv2.line(image, (((x_max_green)).astype(numpy.int64),(y_min_green).astype(numpy.int64)),(((x_min_green)).astype(numpy.int64),(y_min_green).astype(numpy.int64)),(0,0,0),5)
-        avg_dist += perceived_distance
-        avg_x_center_green += x_center_green
-        avg_y_center_green += y_center_green
-
-        found_contours.append((perceived_distance, x_center_green, y_center_green, image)) #creating a tuple with all of the found contours
-    
-    
-
-    avg_dist = avg_dist/num_found_countours
-    avg_x_center_green = avg_x_center_green/num_found_countours
-    avg_y_center_green = avg_y_center_green/num_found_countours
-    cv2.circle(image, (int(avg_x_center_green), int(avg_y_center_green)), radius=7, color=(0, 255, 0), thickness=7)    
-    
-    return (avg_dist, avg_x_center_green, avg_y_center_green, image)
-
-
-
-
-
-def runBall(image, mainContours, isRedAlliance):
-    found_contours = []
-    for contours in mainContours:
-
-        contourPoints = contours[:,0]
-
-        x_points_red = contourPoints[:,0]
-        y_points_red = contourPoints[:,1]
-
-        x_min_red = numpy.amin(x_points_red)
-        x_max_red = numpy.amax(x_points_red)
-        red_width = x_max_red - x_min_red
-        FOCAL_LENGTH = 289.1 #old 217.42   
-        
-
-
-
-        #call distance function to return widths
-        Red_Real_Width = 9.5 #in
-        perceived_distance = (FOCAL_LENGTH*Red_Real_Width)/red_width
-
-
-        y_min_red = numpy.amin(y_points_red)
-        y_max_red = numpy.amax(y_points_red)
-
-        x_center_red = ((x_max_red - x_min_red)/2) + x_min_red
-        y_center_red = ((y_max_red - y_min_red)/2) + y_min_red
-
-        
-
-
-        #Draws center of balls
-        #image = cv2.line(image, ((x_center_yellow).astype(numpy.int64),((y_center_yellow) - 15).astype(numpy.int64)),((x_center_yellow).astype(numpy.int64),((y_center_yellow) + 15).astype(numpy.int64)),(0,0,0),3)
-        #image = cv2.line(image, (((x_center_yellow) - 15).astype(numpy.int64),(y_center_yellow).astype(numpy.int64)),(((x_center_yellow) + 15).astype(numpy.int64),(y_center_yellow).astype(numpy.int64)),(0,0,0),3)
-
-        #Draws box around balls
-        image = cv2.line(image, ((x_max_red).astype(numpy.int64),((y_max_red)).astype(numpy.int64)),((x_max_red).astype(numpy.int64),((y_min_red)).astype(numpy.int64)),(0,0,0),5)
-        image = cv2.line(image, (((x_min_red)).astype(numpy.int64),(y_max_red).astype(numpy.int64)),(((x_min_red)).astype(numpy.int64),(y_min_red).astype(numpy.int64)),(0,0,0),5)
-        image = cv2.line(image, ((x_max_red).astype(numpy.int64),((y_max_red)).astype(numpy.int64)),((x_min_red).astype(numpy.int64),((y_max_red)).astype(numpy.int64)),(0,0,0),5)
-        image = cv2.line(image, (((x_max_red)).astype(numpy.int64),(y_min_red).astype(numpy.int64)),(((x_min_red)).astype(numpy.int64),(y_min_red).astype(numpy.int64)),(0,0,0),5)
-    
-        found_contours.append((perceived_distance, x_center_red, y_center_red, image)) #creating a tuple with all of the found contours
-    
-    closestBallData = tuple()
-    shortestDistance = 10000000000000000
-    '''
-    This is a new filter'''
-    filtered_contours = []
-    for data_tup in found_contours:
-        if (data_tup[2] > 90) and (data_tup[2] < 235):
-            filtered_contours.append(data_tup)
-    #end of new filter
-    #for data_tup in found_contours:
-    count = 0
-    for data_tup in filtered_contours:
-        if data_tup[0] < shortestDistance:
-            shortestDistance = data_tup[0]
-            closestBallData = data_tup
-        count += 1
-    #TODO: Add a safety feature here in case there is no data in the tuple, we wont draw the circle
-    
-    if (count > 0):
-        if (isRedAlliance):
-            cv2.circle(image, (int(closestBallData[1]), int(closestBallData[2])), radius=7, color=(0, 0, 255), thickness=7)    
-        else: 
-            cv2.circle(image, (int(closestBallData[1]), int(closestBallData[2])), radius=7, color=(255, 0, 0), thickness=7)    
-
-        return closestBallData
-    
-    return -1, -1, -1, -1
-
-def placeLine(pos, image):
-    #line_divisor = sd.getNumber("Speed Constant", (5000/VIDEO_HEIGHT))
-    #y_val = velocity/line_divisor
-    y_val = int(VIDEO_HEIGHT - pos)
-
-    cv2.line(image, (0, y_val), (VIDEO_WIDTH, y_val), (23, 177, 251), 2)
-
 
 if __name__ == "__main__":
     if len(sys.argv) >= 2:
@@ -394,96 +295,56 @@ if __name__ == "__main__":
     print("Camera Default Configurations Complete")
 
 
-    RedGrip = RedBallGripPipeline()
-    GreenGrip = ReflectiveTapeContours()
-    BlueGrip = BlueBallGripPipeline()
-
     sinkA = CvSink("main cam")  
     sinkB = CvSink("reverse cam")
 
     sinkA.setSource(cameras[0]) #CAMERA ID
     sinkB.setSource(cameras[1])
 
+    #one grab thread per camera so neither camera's exposure blocks the loop
+    captureA = CaptureThread(sinkA, VIDEO_WIDTH, VIDEO_HEIGHT)
+    captureB = CaptureThread(sinkB, VIDEO_WIDTH, VIDEO_HEIGHT)
+    captureA.start()
+    captureB.start()
 
-    image_A = numpy.ndarray((VIDEO_WIDTH,VIDEO_HEIGHT,3), dtype = numpy.uint8)
-    image_B = numpy.ndarray((VIDEO_WIDTH,VIDEO_HEIGHT,3), dtype = numpy.uint8)
-    
     camservInst = CameraServer.getInstance()
-    dashSource1 = camservInst.putVideo("UI Active Cam", VIDEO_WIDTH, VIDEO_HEIGHT) #creating a single main camera object
+    #the dashboard stream is fed from its own thread, at most STREAM_FPS frames a second
+    streamConfig = visionSettings.streamConfig
+    streamWidth = streamConfig.get("width", VIDEO_WIDTH)
+    streamHeight = streamConfig.get("height", VIDEO_HEIGHT)
+    streamFps = streamConfig.get("fps", STREAM_FPS)
+    dashSource1 = CvSource("UI Active Cam", VideoMode.PixelFormat.kMJPEG, streamWidth, streamHeight, streamFps) #creating a single main camera object
+    dashServer = camservInst.startAutomaticCapture(camera=dashSource1, return_server=True)
+    if "quality" in streamConfig:
+        dashServer.setDefaultCompression(streamConfig["quality"])
+    dashStream = DashboardStream(dashSource1, streamWidth, streamHeight, streamFps)
+    dashStream.start()
+
+    #the last seconds of raw frames are written to disk when the robot sets 'Record Match' or the match ends
+    recorder = None
+    recordConfig = visionSettings.recordConfig
+    if recordConfig is not None:
+        recorder = MatchRecorder(recordConfig.get("directory", "/home/pi/recordings"), VIDEO_WIDTH, VIDEO_HEIGHT,
+                                 recordConfig.get("seconds", RECORD_SECONDS), recordConfig.get("fps", 30),
+                                 recordConfig.get("compress", False))
+        recorder.start()
 
     sd = ntinst.getTable('SmartDashboard') #getting the smart dashboard object
+
+    #pipelines only search their camera's region of interest, if one is configured
+    ballRoi, reflectiveRoi = cameraRegions(visionSettings, [config.name for config in cameraConfigs])
+    loop = VisionLoop(visionSettings, captureA, captureB, sd, ntinst,
+                      ballRoi=ballRoi, reflectiveRoi=reflectiveRoi,
+                      stream=dashStream, recorder=recorder)
     
     
     
     print("initalize complete")
 
-    
-    while True:
-        isRedAlliance = sd.getBoolean("isRedAlliance", True)
-        isReversed = sd.getBoolean("isReversed", False)
-        timestamp,image_A = sinkA.grabFrame(image_A) #collecting the frame 
-        timestamp, image_B = sinkB.grabFrame(image_B)
-        GreenGrip.process(image_B)
-        green_contours = GreenGrip.filter_contours_output
-        
-        
-        if (isRedAlliance):
-            RedGrip.process(image_A) #passing image_A and searching for the red ball
-            red_contours = RedGrip.filter_contours_output
-            main_contours = red_contours
-        else:
-            BlueGrip.process(image_A)
-            blue_contours = BlueGrip.filter_contours_output
-            main_contours = blue_contours
-        
-        motor_velocity = sd.getNumber("Motor Velocity", 0) #getting the motor velocity
-        
-        for contour in main_contours:
-            cv2.drawContours(image_A, contour, -1, (0, 255, 0), 3)
-
-        
-        
-        for contour in green_contours:
-            cv2.drawContours(image_B, contour, -1, (0, 255, 0), 3)
-
-
-        ball_dist = -1
-        green_dist = -1
-        x_center_ball = -1
-        y_center_ball = -1
-        if main_contours != []:
-            ball_dist, x_center_ball, y_center_ball, image_A = runBall(image_A, main_contours, isRedAlliance)
-
-            if (not x_center_ball == -1):
-                x_center_ball = x_center_ball/VIDEO_WIDTH
-                y_center_ball = y_center_ball/VIDEO_HEIGHT
-                
-        sd.putNumber('Ball X', x_center_ball)
-        sd.putNumber('Ball Y', y_center_ball)
-        sd.putNumber('Ball Distance', ball_dist)
-        
-        if (x_center_ball == -1):
-            timestamp, image_A = sinkA.grabFrame(image_A) #get the frame again if there is nothing
-
-        if green_contours != []:
-            green_dist, x_center_green, y_center_green, image_B = runReflective(image_B, green_contours)
-
-            #x center and y center is in terms of pixels, converting pixels to a value between 0 and 1
-            x_center_green = x_center_green/VIDEO_WIDTH
-            y_center_green = y_center_green/VIDEO_HEIGHT
-            sd.putNumber('Green X', x_center_green)
-            sd.putNumber('Green Y', y_center_green)
-            sd.putNumber('Green Distance', green_dist)
-        
-        placeLine(VIDEO_HEIGHT-48, image_B)
-        
-        if (isReversed):
-            dashSource1.putFrame(image_B)
-        else:
-            dashSource1.putFrame(image_A) #putting the postProcessed frame onto smartdashboard
+    loop.run()
         
         
-        #TODO: Make sure to publish the contours report onto SmartDashboard
+    #TODO: Make sure to publish the contours report onto SmartDashboard
        
 
 
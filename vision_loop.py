@@ -0,0 +1,533 @@
+import time
+import cv2
+import numpy
+from bb_grip_contours import BlueBallGripPipeline
+from rb_grip_contours import RedBallGripPipeline
+from ReflectiveTapeContours import ReflectiveTapeContours
+from pipeline_executor import PipelineExecutor
+from pipeline_scheduler import PipelineScheduler
+from grip_loader import GripFilePipeline
+from grip_pipeline import ColourSpaceCache
+from contour_measurements import ContourMeasurements
+from tracking_window import TrackingWindow
+from ball_tracker import BallTracker
+from vision_publisher import VisionPublisher
+from nt_inputs import InputCache
+from display_list import DisplayList
+from perf_stats import PerfStats
+
+
+VIDEO_WIDTH = 320
+VIDEO_HEIGHT = 240
+FRAME_TIMEOUT = 0.1 #longest the loop waits for a new frame, in seconds
+GRIP_RELOAD_INTERVAL = 1.0 #how often .grip files are checked for edits, in seconds
+BALL_INTERVAL = 1 #frames between ball searches, none while shooting
+REFLECTIVE_INTERVAL = 5 #frames between reflective tape searches
+REFLECTIVE_INTERVAL_AIMING = 1 #frames between reflective tape searches while aiming
+STREAM_FPS = 15 #default limit on the dashboard stream's frame rate
+RECORD_SECONDS = 5 #default length of the match recording
+FMS_ENABLED = 0x01 #the robot enabled bit of FMSInfo/FMSControlData
+
+BALL_FOCAL_LENGTH = 289.1 #old 217.42
+BALL_REAL_WIDTH = 9.5 #in
+BALL_MIN_Y = 90 #balls centred outside this band of rows are ignored
+BALL_MAX_Y = 235
+REFLECTIVE_FOCAL_LENGTH = 374.8 #289.1 #old 217.42
+REFLECTIVE_REAL_WIDTH = 5 #in
+
+
+class VisionSettings:
+    """The options of the "vision" object in /boot/frc.json, see uploaded.py."""
+
+    def __init__(self):
+        self.parallelPipelines = False
+        self.detectOpponentBalls = False
+        self.hsvLookupTable = False
+        self.trackingWindow = False
+        self.reacquireInterval = 15
+        self.ballTracker = False
+        self.extrapolate = False
+        self.legacyKeys = True
+        self.streamConfig = {}
+        self.recordConfig = None
+        self.perf = False
+        self.gripFiles = {}
+        self.regionsOfInterest = {}
+
+
+def readVisionSettings(vision):
+    """Reads the "vision" object of the configuration file.
+    Args:
+        vision: The parsed JSON value.
+    Returns:
+        A VisionSettings.
+    Raises:
+        ValueError: If a setting is not understood.
+    """
+    settings = VisionSettings()
+    if not isinstance(vision, dict):
+        raise ValueError("vision must be JSON object")
+    settings.parallelPipelines = bool(vision.get("parallel pipelines", settings.parallelPipelines))
+    settings.detectOpponentBalls = bool(vision.get("detect opponent balls", settings.detectOpponentBalls))
+    settings.hsvLookupTable = bool(vision.get("hsv lookup table", settings.hsvLookupTable))
+    settings.trackingWindow = bool(vision.get("tracking window", settings.trackingWindow))
+    settings.ballTracker = bool(vision.get("ball tracker", settings.ballTracker))
+    settings.extrapolate = bool(vision.get("extrapolate", settings.extrapolate))
+    settings.perf = bool(vision.get("perf", settings.perf))
+    settings.legacyKeys = bool(vision.get("legacy keys", settings.legacyKeys))
+    settings.streamConfig = vision.get("stream", settings.streamConfig)
+    if not isinstance(settings.streamConfig, dict):
+        raise ValueError("stream must be JSON object")
+    settings.recordConfig = vision.get("record", settings.recordConfig)
+    if settings.recordConfig is not None and not isinstance(settings.recordConfig, dict):
+        raise ValueError("record must be JSON object")
+    settings.reacquireInterval = vision.get("reacquire interval", settings.reacquireInterval)
+    if not isinstance(settings.reacquireInterval, int) or settings.reacquireInterval < 1:
+        raise ValueError("reacquire interval must be a positive integer")
+    settings.gripFiles = vision.get("grip files", settings.gripFiles)
+    if not isinstance(settings.gripFiles, dict):
+        raise ValueError("grip files must be JSON object")
+    for name, path in settings.gripFiles.items():
+        if name not in ("red ball", "blue ball", "reflective tape"):
+            raise ValueError("unknown grip file '{}'".format(name))
+        if not isinstance(path, str):
+            raise ValueError("grip file '{}' must be a path".format(name))
+    settings.regionsOfInterest = vision.get("roi", settings.regionsOfInterest)
+    if not isinstance(settings.regionsOfInterest, dict):
+        raise ValueError("roi must be JSON object")
+    for name, roi in settings.regionsOfInterest.items():
+        if not (isinstance(roi, list) and len(roi) == 4 and all(isinstance(v, int) for v in roi)):
+            raise ValueError("roi for '{}' must be [x, y, width, height]".format(name))
+    return settings
+
+
+def configCameraNames(config):
+    """The camera names of a parsed configuration file, in the order of its "cameras" list."""
+    cameras = config.get("cameras", [])
+    if not isinstance(cameras, list):
+        return []
+    return [camera.get("name") for camera in cameras if isinstance(camera, dict)]
+
+
+def cameraRegions(settings, cameraNames):
+    """Picks the regions of interest of the ball and reflective tape cameras.
+    Args:
+        settings: A VisionSettings.
+        cameraNames: The configured camera names, in the order of the "cameras" list.
+            The first is the ball camera and the second the reflective tape camera.
+    Returns:
+        A tuple of the ball and reflective tape cameras' regions, each None if there is none.
+    Raises:
+        ValueError: If a region is for a camera that isn't configured.
+    """
+    for name in settings.regionsOfInterest:
+        if name not in cameraNames:
+            raise ValueError("roi for '{}', which is not a configured camera".format(name))
+    names = list(cameraNames[:2]) + [None] * (2 - len(cameraNames[:2]))
+    return tuple(settings.regionsOfInterest.get(name) for name in names)
+
+
+def runReflective(mainContours, display=None):
+    greens = ContourMeasurements(mainContours, REFLECTIVE_FOCAL_LENGTH, REFLECTIVE_REAL_WIDTH)
+
+    avg_dist = numpy.mean(greens.distance)
+    avg_x_center_green = numpy.mean(greens.x_center)
+    avg_y_center_green = numpy.mean(greens.y_center)
+
+    #Draws box around the tape
+    if display is not None:
+        display.boxes(greens, (0,0,0), 5)
+        display.circle((avg_x_center_green, avg_y_center_green), 7, (0, 255, 0), 7)
+
+    return (avg_dist, avg_x_center_green, avg_y_center_green)
+
+
+def runBall(mainContours, isRedAlliance, tracker=None, timestamp=0, lead=0, display=None):
+    """Picks the ball to drive to, either the closest one in this frame or the tracker's target.
+
+    With a tracker the returned position is the target's filtered position
+    extrapolated lead seconds past the frame's capture timestamp. The boxes
+    and the chosen ball are recorded in display, if given.
+    """
+    balls = ContourMeasurements(mainContours, BALL_FOCAL_LENGTH, BALL_REAL_WIDTH)
+
+    #Draws box around balls
+    if display is not None:
+        display.boxes(balls, (0,0,0), 5)
+
+    #only balls whose centre is inside the y band can be picked up
+    candidates = numpy.flatnonzero((balls.y_center > BALL_MIN_Y) & (balls.y_center < BALL_MAX_Y))
+    if tracker is not None:
+        target = tracker.update(balls.x_center[candidates], balls.y_center[candidates],
+                                balls.distance[candidates], timestamp)
+        if target is None:
+            return -1, -1, -1
+        x_center, y_center, distance = target.position(lead)
+        closestBallData = (distance, x_center, y_center)
+    elif len(candidates) == 0:
+        return -1, -1, -1
+    else:
+        closest = candidates[numpy.argmin(balls.distance[candidates])]
+        closestBallData = (balls.distance[closest], balls.x_center[closest], balls.y_center[closest])
+
+    if display is not None:
+        colour = (0, 0, 255) if isRedAlliance else (255, 0, 0)
+        display.circle(closestBallData[1:], 7, colour, 7)
+
+    return closestBallData
+
+
+def rejectOpponentBalls(mainContours, opponentContours):
+    """Drops ball contours whose centre lies inside an opponent ball's bounding box."""
+    if not opponentContours:
+        return mainContours
+    opponentBoxes = [cv2.boundingRect(contour) for contour in opponentContours]
+    kept = []
+    for contour in mainContours:
+        x, y, w, h = cv2.boundingRect(contour)
+        x_center = x + w/2
+        y_center = y + h/2
+        if not any(bx <= x_center <= bx + bw and by <= y_center <= by + bh for bx, by, bw, bh in opponentBoxes):
+            kept.append(contour)
+    return kept
+
+
+def frameLatency(capture, timestamp):
+    """The time since a frame was captured in ms, or -1 if it isn't known."""
+    captured = capture.captureTime(timestamp)
+    if captured is None:
+        return -1
+    return (time.monotonic() - captured) * 1000
+
+
+def placeLine(pos, display):
+    #line_divisor = sd.getNumber("Speed Constant", (5000/VIDEO_HEIGHT))
+    #y_val = velocity/line_divisor
+    y_val = int(VIDEO_HEIGHT - pos)
+
+    display.line((0, y_val), (VIDEO_WIDTH, y_val), (23, 177, 251), 2)
+
+
+class VisionLoop:
+    """The vision processing loop, without any cscore objects.
+
+    Frames come from two capture objects with the CaptureThread interface,
+    waitForFrame(), getLatest() and captureTime(). Captures are "A" for the
+    ball camera and "B" for the reflective tape camera. Results are
+    published to an NT table, and robot inputs are read from it. uploaded.py
+    runs it on the robot's cameras, and replay.py on recorded frames.
+    """
+
+    def __init__(self, settings, captureA, captureB, table, ntinst, ballRoi=None, reflectiveRoi=None,
+                 stream=None, recorder=None):
+        """
+        Args:
+            settings: A VisionSettings.
+            captureA: The ball camera's frames.
+            captureB: The reflective tape camera's frames.
+            table: The NT table to publish to and read robot inputs from.
+            ntinst: The NT instance, flushed after each frame.
+            ballRoi: The region of the ball camera to search, or None.
+            reflectiveRoi: The region of the reflective tape camera to search, or None.
+            stream: A DashboardStream for the annotated frames, or None.
+            recorder: A MatchRecorder for the raw frames, or None.
+        """
+        self.settings = settings
+        self.captureA = captureA
+        self.captureB = captureB
+        self.stream = stream
+        self.recorder = recorder
+
+        #pipelines listed under "grip files" are built straight from the .grip project
+        #and pick up edits to it while running
+        gripFiles = settings.gripFiles
+        self.redGrip = GripFilePipeline(gripFiles["red ball"]) if "red ball" in gripFiles else RedBallGripPipeline()
+        self.greenGrip = GripFilePipeline(gripFiles["reflective tape"]) if "reflective tape" in gripFiles else ReflectiveTapeContours()
+        self.blueGrip = GripFilePipeline(gripFiles["blue ball"]) if "blue ball" in gripFiles else BlueBallGripPipeline()
+        #each step is timed and its percentiles published to Vision/Perf, only if enabled
+        self.perf = PerfStats(ntinst.getTable("Vision/Perf")) if settings.perf else None
+        if self.perf is not None:
+            self.redGrip.perf = self.perf.scope("red ball")
+            self.greenGrip.perf = self.perf.scope("reflective tape")
+            self.blueGrip.perf = self.perf.scope("blue ball")
+            if stream is not None:
+                stream.perf = self.perf
+
+        self.filePipelines = [grip for grip in (self.redGrip, self.greenGrip, self.blueGrip)
+                              if isinstance(grip, GripFilePipeline)]
+
+        if settings.hsvLookupTable:
+            #kept by the pipelines when a .grip file is reloaded
+            for grip in (self.redGrip, self.greenGrip, self.blueGrip):
+                grip.useLookupTable(True)
+
+        #the ball pipelines share one HSV conversion of image_A, so also looking for
+        #the opponent's balls costs little more than looking for ours
+        self.colourCache = ColourSpaceCache()
+        self.redGrip.colour_cache = self.colourCache
+        self.blueGrip.colour_cache = self.colourCache
+        #image_B has its own cache, so its conversion doesn't wait on image_A's lock
+        #when the pipelines run in parallel
+        self.colourCacheB = ColourSpaceCache()
+        self.greenGrip.colour_cache = self.colourCacheB
+
+        #pipelines only search their camera's region of interest, if one is configured
+        self.ballRoi = ballRoi
+        self.redGrip.roi = ballRoi
+        self.blueGrip.roi = ballRoi
+        self.greenGrip.roi = reflectiveRoi
+        self.ballGrip = self.redGrip
+        self.opponentGrip = self.blueGrip
+
+        #once a ball is found, only a window around it is searched until it is lost
+        self.ballWindow = TrackingWindow(reacquire_interval=settings.reacquireInterval)
+        self.ballBounds = ballRoi if ballRoi is not None else (0, 0, VIDEO_WIDTH, VIDEO_HEIGHT)
+
+        #follows every ball across frames so the published target is smoothed and doesn't jump between balls
+        self.tracker = BallTracker() if settings.ballTracker else None
+
+        #runs the ball and reflective tape pipelines, on separate cores if enabled
+        self.executor = PipelineExecutor(settings.parallelPipelines)
+        self.scheduler = PipelineScheduler()
+
+        #results are collected through the frame and published together once it is done
+        self.publisher = VisionPublisher(table, ntinst, settings.legacyKeys)
+
+        #robot inputs are updated by NT listeners instead of being polled every loop
+        self.inputs = InputCache(table)
+        self.inputs.addBoolean("isRedAlliance", "isRedAlliance", True)
+        self.inputs.addBoolean("isReversed", "isReversed", False)
+        self.inputs.addNumber("motorVelocity", "Motor Velocity", 0)
+        self.inputs.addBoolean("isAiming", "isAiming", False)
+        self.inputs.addBoolean("isShooting", "isShooting", False)
+
+        #the recording is written when the robot asks for it and when the FMS disables the robot
+        self.inputs.addBoolean("recordMatch", "Record Match", False)
+        self.fmsInputs = InputCache(ntinst.getTable("FMSInfo"))
+        self.fmsInputs.addNumber("controlData", "FMSControlData", 0)
+        self.fmsEnabled = False
+
+        self.image_A = numpy.ndarray((VIDEO_HEIGHT,VIDEO_WIDTH,3), dtype = numpy.uint8)
+        self.image_B = numpy.ndarray((VIDEO_HEIGHT,VIDEO_WIDTH,3), dtype = numpy.uint8)
+        self.frame_A = 0
+        self.frame_B = 0
+        self.capture_errors = {} #the last error printed for each camera
+        self.loop_count = 0
+        self.ball_run = None #loop_count of the last frame each pipeline ran on
+        self.reflective_run = None
+        self.ball_contours = None #the last frame's contours, None if the pipeline didn't run on it
+        self.tape_contours = None
+        self.last_reload = time.monotonic()
+
+    def run(self):
+        while True:
+            #only wait for a ball frame that has not been processed yet, and never
+            #longer than FRAME_TIMEOUT, so a stalled camera can't stall the loop;
+            #step() doesn't run the ball pipeline again on the old frame
+            self.captureA.waitForFrame(self.frame_A, FRAME_TIMEOUT)
+            self.step()
+
+    def step(self):
+        """Processes the newest frames and publishes the results."""
+        settings = self.settings
+        inputs = self.inputs
+        publisher = self.publisher
+        perf = self.perf
+        loop_start = time.monotonic()
+
+        if loop_start - self.last_reload >= GRIP_RELOAD_INTERVAL:
+            for grip in self.filePipelines:
+                if grip.reload():
+                    print("reloaded '{}'".format(grip.path))
+            self.last_reload = loop_start
+
+        #checked before reading, so a change that lands in between is picked up next loop
+        allianceChanged = inputs.changed("isRedAlliance")
+        isRedAlliance = inputs.isRedAlliance
+        isReversed = inputs.isReversed
+        previous_A, previous_B = self.frame_A, self.frame_B
+        timestamp_A, self.frame_A, image_A = self.captureA.getLatest(self.image_A) #collecting the newest frame
+        timestamp_B, self.frame_B, image_B = self.captureB.getLatest(self.image_B)
+        #a stalled camera serves its last frame again, which isn't a new result
+        freshA = self.frame_A != previous_A
+        freshB = self.frame_B != previous_B
+        self.reportCaptureError("ball", self.captureA)
+        self.reportCaptureError("reflective tape", self.captureB)
+        if perf is not None:
+            perf.lap("grab", loop_start)
+        self.image_A = image_A
+        self.image_B = image_B
+        self.colourCache.newFrame()
+        self.colourCacheB.newFrame()
+        if allianceChanged:
+            if (isRedAlliance):
+                self.ballGrip = self.redGrip #searching image_A for the red ball
+                self.opponentGrip = self.blueGrip
+            else:
+                self.ballGrip = self.blueGrip
+                self.opponentGrip = self.redGrip
+            self.opponentGrip.roi = self.ballRoi #it may still have the tracking window from when it was ours
+            self.ballWindow.reset()
+            if self.tracker is not None:
+                self.tracker.reset()
+        BallGrip = self.ballGrip
+        OpponentGrip = self.opponentGrip
+        if settings.trackingWindow:
+            BallGrip.roi = self.ballWindow.region(self.ballBounds)
+
+        #annotations are only recorded for the camera on the dashboard, and only when the
+        #stream wants a frame; the stream thread draws them
+        streaming = self.stream is not None and self.stream.wantsFrame()
+        display_A = DisplayList() if streaming and not isReversed else None
+        display_B = DisplayList() if streaming and isReversed else None
+
+        #the robot's state sets how often each pipeline runs, and neither runs without a new frame
+        #from its camera; a skipped pipeline publishes nothing new that frame, so its age goes up
+        ballDue = freshA and self.scheduler.due("ball", 0 if inputs.isShooting else BALL_INTERVAL, self.loop_count)
+        reflectiveDue = freshB and self.scheduler.due("reflective", REFLECTIVE_INTERVAL_AIMING if inputs.isAiming
+                                                      else REFLECTIVE_INTERVAL, self.loop_count)
+
+        self.ball_contours = None
+        self.tape_contours = None
+        jobs = []
+        if ballDue:
+            jobs.append(("ball", BallGrip, image_A))
+            if settings.detectOpponentBalls:
+                jobs.append(("opponent", OpponentGrip, image_A))
+        if reflectiveDue:
+            jobs.append(("reflective", self.greenGrip, image_B))
+        self.executor.run(jobs)
+        self.scheduler.tick()
+
+        motor_velocity = inputs.motorVelocity #getting the motor velocity
+
+        if ballDue:
+            if settings.trackingWindow and self.ballWindow.windowed and not BallGrip.filter_contours_output:
+                #the ball left the window, so search the whole frame again before giving up on it
+                self.ballWindow.reset()
+                BallGrip.roi = self.ballRoi
+                BallGrip.process(image_A)
+            main_contours = BallGrip.filter_contours_output
+            if settings.detectOpponentBalls:
+                main_contours = rejectOpponentBalls(main_contours, OpponentGrip.filter_contours_output)
+                publisher.putNumber('Opponent Ball Count', len(OpponentGrip.filter_contours_output))
+            self.ball_contours = main_contours
+
+            if display_A is not None:
+                display_A.contourPoints(main_contours, (0, 255, 0), 3)
+
+            ball_dist = -1
+            x_center_ball = -1
+            y_center_ball = -1
+            if perf is not None:
+                start = time.monotonic()
+            if self.tracker is not None:
+                #the tracker needs every frame, even ones without contours, to count misses.
+                #when extrapolating, the target is moved forward from capture to the time it is published
+                lead = max(frameLatency(self.captureA, timestamp_A), 0) / 1000 if settings.extrapolate else 0
+                ball_dist, x_center_ball, y_center_ball = runBall(main_contours, isRedAlliance,
+                                                                  self.tracker, timestamp_A / 1e6, lead, display_A)
+                publisher.putNumber('Ball ID', self.tracker.target.id if self.tracker.target is not None else -1)
+            elif main_contours != []:
+                ball_dist, x_center_ball, y_center_ball = runBall(main_contours, isRedAlliance, display=display_A)
+            if perf is not None:
+                perf.lap("run ball", start)
+            if settings.trackingWindow:
+                #runBall only returns the distance, which gives back the ball's width in pixels
+                self.ballWindow.update(x_center_ball, y_center_ball, BALL_FOCAL_LENGTH*BALL_REAL_WIDTH/ball_dist)
+
+            if (not x_center_ball == -1):
+                x_center_ball = x_center_ball/VIDEO_WIDTH
+                y_center_ball = y_center_ball/VIDEO_HEIGHT
+
+            publisher.putNumber('Ball X', x_center_ball)
+            publisher.putNumber('Ball Y', y_center_ball)
+            publisher.putNumber('Ball Distance', ball_dist)
+            publisher.putNumber('Ball Timestamp', timestamp_A) #cscore capture time, in us
+            publisher.putNumber('Ball Latency', frameLatency(self.captureA, timestamp_A)) #capture to publish, in ms
+
+        if reflectiveDue:
+            green_contours = self.greenGrip.filter_contours_output
+            self.tape_contours = green_contours
+            if display_B is not None:
+                display_B.contourPoints(green_contours, (0, 255, 0), 3)
+
+            green_dist = -1
+            x_center_green = -1
+            y_center_green = -1
+            if green_contours != []:
+                if perf is not None:
+                    start = time.monotonic()
+                green_dist, x_center_green, y_center_green = runReflective(green_contours, display_B)
+                if perf is not None:
+                    perf.lap("run reflective", start)
+
+                #x center and y center is in terms of pixels, converting pixels to a value between 0 and 1
+                x_center_green = x_center_green/VIDEO_WIDTH
+                y_center_green = y_center_green/VIDEO_HEIGHT
+            #published even when nothing was found, so the snapshot doesn't keep an older find
+            publisher.putNumber('Green X', x_center_green)
+            publisher.putNumber('Green Y', y_center_green)
+            publisher.putNumber('Green Distance', green_dist)
+            publisher.putNumber('Green Timestamp', timestamp_B)
+            publisher.putNumber('Green Latency', frameLatency(self.captureB, timestamp_B))
+
+        #skipped pipelines keep their last results in the snapshot, so their age tells the robot how old they are
+        if ballDue:
+            self.ball_run = self.loop_count
+        if reflectiveDue:
+            self.reflective_run = self.loop_count
+        publisher.putNumber('Ball Age', self.loop_count - self.ball_run if self.ball_run is not None else -1)
+        publisher.putNumber('Green Age', self.loop_count - self.reflective_run if self.reflective_run is not None else -1)
+
+        for name, rate in self.scheduler.rates.items():
+            publisher.putNumber('Vision Rate ' + name, rate) #pipeline runs per second
+
+        self.loop_count += 1
+        publisher.putNumber('Vision Loop Count', self.loop_count)
+        publisher.putNumber('Vision Loop Latency', (time.monotonic() - loop_start) * 1000) #in ms
+        if perf is not None:
+            start = time.monotonic()
+        publisher.flush() #sent before the dashboard frame so the robot gets the results first
+        if perf is not None:
+            start = perf.lap("publish", start)
+
+        if self.recorder is not None:
+            self.recorder.record(image_A, image_B, timestamp_A, timestamp_B,
+                                 (isRedAlliance, isReversed, motor_velocity), publisher.snapshot)
+            self.checkRecordTriggers()
+            if perf is not None:
+                perf.lap("record", start)
+
+        if display_B is not None:
+            placeLine(VIDEO_HEIGHT-48, display_B)
+            self.stream.submit(image_B, display_B)
+        elif display_A is not None:
+            self.stream.submit(image_A, display_A) #putting the postProcessed frame onto smartdashboard
+
+        if perf is not None:
+            perf.lap("loop", loop_start)
+            perf.tick()
+
+    def reportCaptureError(self, name, capture):
+        """Prints a camera's capture error when it starts, changes or clears."""
+        error = capture.error
+        if error != self.capture_errors.get(name):
+            if error is not None:
+                print("{} camera: {}".format(name, error))
+            else:
+                print("{} camera is sending frames again".format(name))
+            self.capture_errors[name] = error
+
+    def checkRecordTriggers(self):
+        """Writes out the recording when 'Record Match' is set or the match ends."""
+        if self.inputs.changed("recordMatch") and self.inputs.recordMatch:
+            if self.recorder.trigger("requested"):
+                print("writing recording requested by the robot")
+            self.inputs.putBoolean("recordMatch", False) #so the robot can ask again
+        if self.fmsInputs.changed("controlData"):
+            enabled = bool(int(self.fmsInputs.controlData) & FMS_ENABLED)
+            if self.fmsEnabled and not enabled:
+                if self.recorder.trigger("match end"):
+                    print("writing recording of the end of the match")
+            self.fmsEnabled = enabled
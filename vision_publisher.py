@@ -0,0 +1,65 @@
+# the layout of the 'Vision Snapshot' number array, also published as 'Vision Snapshot Fields'.
+# the ball and green fields are the last results of their pipeline, which doesn't run every
+# frame; their age is the number of frames since it ran, 0 for this frame and -1 for never.
+# X, Y and Distance are -1 when the pipeline ran but found nothing
+SNAPSHOT_FIELDS = (
+    "Vision Loop Count",
+    "Vision Loop Latency",
+    "Ball X",
+    "Ball Y",
+    "Ball Distance",
+    "Ball ID",
+    "Ball Timestamp",
+    "Ball Latency",
+    "Green X",
+    "Green Y",
+    "Green Distance",
+    "Green Timestamp",
+    "Green Latency",
+    "Ball Age",
+    "Green Age",
+)
+
+
+class VisionPublisher:
+    """Collects one frame's results and publishes them together.
+
+    putNumber() only records a value. flush() writes every snapshot field as
+    one 'Vision Snapshot' number array, so the robot never reads values
+    from different frames, and then flushes NetworkTables so the update goes
+    out now instead of at the next periodic update. Fields that were not
+    put this frame keep their last value in the snapshot, -1 until they are
+    first put.
+
+    With legacy_keys the snapshot fields are also written to their own keys,
+    as before. These keys also keep their last value when a field is not put,
+    but are only consistent with each other within the snapshot. Values that
+    aren't snapshot fields are always written to their own keys.
+    """
+
+    def __init__(self, table, ntinst, legacy_keys=True):
+        self.table = table
+        self.ntinst = ntinst
+        self.legacy_keys = legacy_keys
+        self.__values = {}
+        self.__snapshot = [-1.0] * len(SNAPSHOT_FIELDS)
+        table.putStringArray('Vision Snapshot Fields', SNAPSHOT_FIELDS)
+
+    @property
+    def snapshot(self):
+        """The last flushed 'Vision Snapshot', in the order of SNAPSHOT_FIELDS."""
+        return self.__snapshot
+
+    def putNumber(self, key, value):
+        self.__values[key] = float(value)
+
+    def flush(self):
+        """Publishes the values put since the last flush."""
+        for i, field in enumerate(SNAPSHOT_FIELDS):
+            self.__snapshot[i] = self.__values.get(field, self.__snapshot[i])
+        self.table.putNumberArray('Vision Snapshot', self.__snapshot)
+        for key, value in self.__values.items():
+            if self.legacy_keys or key not in SNAPSHOT_FIELDS:
+                self.table.putNumber(key, value)
+        self.__values.clear()
+        self.ntinst.flush()